@@ -0,0 +1,164 @@
+"""
+Offline batch submission for large API sweeps
+Packages api_harness requests into each provider's batch job format (OpenAI
+batch JSONL, Anthropic message batches), submits them, polls until the jobs
+end and returns replies in the same shape as run_requests: one str, or the
+exception of a failed line, per request and in request order
+
+Selected for every script with API_SUBMIT_MODE=batch, or called directly:
+    replies = run_batch([chat('openai', prompt, temperature=0) for prompt in prompts])
+"""
+
+import json
+import os
+import time
+from typing import Dict, List, Optional, Sequence, Union
+from api_cache import CACHE_MODES, DEFAULT_MODE, ApiResponseCache, cacheable, default_cache
+from api_harness import ANTHROPIC_MAX_TOKENS, PROVIDERS
+
+POLL_SECONDS = float(os.getenv('API_BATCH_POLL_SECONDS', '30'))
+
+# Both providers promise results within 24 hours
+TIMEOUT_SECONDS = float(os.getenv('API_BATCH_TIMEOUT_SECONDS', str(24 * 3600)))
+
+OPENAI_ENDPOINT = '/v1/chat/completions'
+OPENAI_DONE = ('completed', 'failed', 'expired', 'cancelled')
+
+
+def openai_batch_file(requests: Sequence[Dict], custom_ids: Sequence[str]) -> bytes:
+    """The JSONL input file of an OpenAI batch, one chat-completions call per line"""
+    lines = [
+        json.dumps({
+            'custom_id': custom_id,
+            'method': 'POST',
+            'url': OPENAI_ENDPOINT,
+            'body': {'model': r['model'], 'messages': r['messages'], **r['params']}
+        })
+        for r, custom_id in zip(requests, custom_ids)
+    ]
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def anthropic_batch_requests(requests: Sequence[Dict], custom_ids: Sequence[str]) -> List[Dict]:
+    """The requests list of an Anthropic message batch"""
+    return [
+        {
+            'custom_id': custom_id,
+            'params': {'model': r['model'], 'messages': r['messages'],
+                       'max_tokens': ANTHROPIC_MAX_TOKENS, **r['params']}
+        }
+        for r, custom_id in zip(requests, custom_ids)
+    ]
+
+
+def _poll(retrieve, done, poll_seconds: float, timeout: float):
+    deadline = time.monotonic() + timeout
+    job = retrieve()
+    while not done(job):
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Batch {job.id} still running after {timeout:.0f}s")
+        time.sleep(poll_seconds)
+        job = retrieve()
+    return job
+
+
+def submit_openai(client, requests: Sequence[Dict], custom_ids: Sequence[str],
+                  poll_seconds: float = POLL_SECONDS, timeout: float = TIMEOUT_SECONDS) -> Dict[str, Union[str, Exception]]:
+    """custom_id -> reply or error, for one OpenAI batch job"""
+    upload = client.files.create(file=('requests.jsonl', openai_batch_file(requests, custom_ids)), purpose='batch')
+    job = client.batches.create(input_file_id=upload.id, endpoint=OPENAI_ENDPOINT, completion_window='24h')
+    job = _poll(lambda: client.batches.retrieve(job.id), lambda j: j.status in OPENAI_DONE,
+                poll_seconds, timeout)
+
+    results = {}
+    for file_id in (job.output_file_id, job.error_file_id):
+        if not file_id:
+            continue
+        for line in client.files.content(file_id).text.splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            response = item.get('response') or {}
+            if response.get('status_code') == 200:
+                results[item['custom_id']] = response['body']['choices'][0]['message']['content']
+            else:
+                error = item.get('error') or response.get('body', {}).get('error')
+                results[item['custom_id']] = RuntimeError(f"openai batch line failed: {error}")
+
+    if len(results) < len(custom_ids):
+        missing = RuntimeError(f"openai batch {job.id} ended '{job.status}' without this result")
+        for custom_id in custom_ids:
+            results.setdefault(custom_id, missing)
+    return results
+
+
+def submit_anthropic(client, requests: Sequence[Dict], custom_ids: Sequence[str],
+                     poll_seconds: float = POLL_SECONDS, timeout: float = TIMEOUT_SECONDS) -> Dict[str, Union[str, Exception]]:
+    """custom_id -> reply or error, for one Anthropic message batch"""
+    job = client.messages.batches.create(requests=anthropic_batch_requests(requests, custom_ids))
+    job = _poll(lambda: client.messages.batches.retrieve(job.id), lambda j: j.processing_status == 'ended',
+                poll_seconds, timeout)
+
+    results = {}
+    for item in client.messages.batches.results(job.id):
+        if item.result.type == 'succeeded':
+            results[item.custom_id] = item.result.message.content[0].text
+        else:
+            detail = getattr(item.result, 'error', None)
+            results[item.custom_id] = RuntimeError(f"anthropic batch line {item.result.type}: {detail}")
+
+    missing = RuntimeError(f"anthropic batch {job.id} ended without this result")
+    for custom_id in custom_ids:
+        results.setdefault(custom_id, missing)
+    return results
+
+
+def _client(provider: str, base_url: Optional[str]):
+    if provider == 'openai':
+        from openai import OpenAI
+        return OpenAI(api_key=os.getenv('OPENAI_API_KEY'), base_url=base_url)
+    from anthropic import Anthropic
+    return Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'), base_url=base_url)
+
+
+def run_batch(requests: Sequence[Dict], poll_seconds: float = POLL_SECONDS,
+              timeout: float = TIMEOUT_SECONDS, base_urls: Optional[Dict[str, str]] = None,
+              cache_mode: str = DEFAULT_MODE, cache: Optional[ApiResponseCache] = None) -> List[Union[str, Exception]]:
+    """
+    run_requests through the batch endpoints: cached replies are reused, the
+    rest go out as one job per provider, and new temperature-0 replies are cached
+    """
+    if cache_mode not in CACHE_MODES:
+        raise ValueError(f"Unknown cache mode '{cache_mode}', expected one of {CACHE_MODES}")
+    if any(r.get('kind', 'chat') != 'chat' for r in requests):
+        raise ValueError("Batch jobs carry chat requests only; send scoring requests interactively")
+    cache = None if cache_mode == 'off' else (cache or default_cache())
+    base_urls = base_urls or {}
+
+    replies = [None] * len(requests)
+    pending = {provider: [] for provider in PROVIDERS}
+    for i, request in enumerate(requests):
+        if cache is not None and cacheable(request):
+            replies[i] = cache.get(request)
+        if replies[i] is None:
+            if cache_mode == 'cache-only':
+                replies[i] = LookupError(f"No cached reply for this {request['provider']} request (cache-only mode)")
+            else:
+                pending[request['provider']].append(i)
+
+    for provider, indices in pending.items():
+        if not indices:
+            continue
+        custom_ids = [f"request-{i}" for i in indices]
+        submit = submit_openai if provider == 'openai' else submit_anthropic
+        try:
+            results = submit(_client(provider, base_urls.get(provider)),
+                             [requests[i] for i in indices], custom_ids, poll_seconds, timeout)
+        except Exception as e:
+            results = {custom_id: e for custom_id in custom_ids}
+
+        for i, custom_id in zip(indices, custom_ids):
+            replies[i] = results[custom_id]
+            if cache is not None and cacheable(requests[i]) and isinstance(replies[i], str):
+                cache.put(requests[i], replies[i])
+    return replies
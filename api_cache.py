@@ -0,0 +1,116 @@
+"""
+Persistent cache of temperature-0 API responses
+Replies (text, or the token logprobs of a scoring call) are keyed by provider,
+model, the full message list or prompt and the sampling parameters, so reruns
+of an analysis replay instead of re-sending prompts
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+DEFAULT_CACHE_PATH = os.getenv(
+    'API_CACHE_PATH',
+    os.path.join(os.path.expanduser('~'), '.cache', 'embodied-cognition', 'api_responses.sqlite')
+)
+
+# Part of every key: bump it (or set API_CACHE_VERSION) to invalidate all stored replies
+CACHE_VERSION = os.getenv('API_CACHE_VERSION', '2')
+
+# Seconds before a stored reply counts as a miss; unset keeps replies forever
+DEFAULT_TTL = float(os.getenv('API_CACHE_TTL')) if os.getenv('API_CACHE_TTL') else None
+
+# 'readwrite', 'cache-only' (replay; a miss is an error) or 'off'
+CACHE_MODES = ('readwrite', 'cache-only', 'off')
+DEFAULT_MODE = os.getenv('API_CACHE_MODE', 'readwrite')
+
+
+def cacheable(request: Dict) -> bool:
+    """Only greedy decoding gives the same reply every time"""
+    return request['params'].get('temperature') == 0
+
+
+class ApiResponseCache:
+    """SQLite store of the JSON reply of each api_harness request"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: Optional[float] = DEFAULT_TTL,
+                 version: str = CACHE_VERSION):
+        self.path = path
+        self.ttl = ttl
+        self.version = version
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, provider TEXT, model TEXT, version TEXT, "
+                "created REAL, reply TEXT)"
+            )
+
+    def request_key(self, request: Dict) -> str:
+        material = json.dumps([self.version, request.get('kind', 'chat'), request['provider'],
+                               request['model'], request.get('messages', request.get('prompt')),
+                               request['params']], sort_keys=True)
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def get(self, request: Dict) -> Optional[Any]:
+        """The stored reply, or None (counted as a miss) if absent or expired"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created, reply FROM responses WHERE key = ?", (self.request_key(request),)
+            ).fetchone()
+            if row is None or (self.ttl is not None and time.time() - row[0] > self.ttl):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return json.loads(row[1])
+
+    def put(self, request: Dict, reply: Any):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, provider, model, version, created, reply) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self.request_key(request), request['provider'], request['model'],
+                 self.version, time.time(), json.dumps(reply))
+            )
+
+    def clear(self, provider: Optional[str] = None, stale_only: bool = False):
+        """Drop every reply (or one provider's); stale_only keeps current-version, unexpired ones"""
+        conditions, params = [], []
+        if provider is not None:
+            conditions.append("provider = ?")
+            params.append(provider)
+        if stale_only:
+            stale = ["version != ?"]
+            params.append(self.version)
+            if self.ttl is not None:
+                stale.append("created < ?")
+                params.append(time.time() - self.ttl)
+            conditions.append(f"({' OR '.join(stale)})")
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM responses{where}", params)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        return {'entries': size, 'hits': self.hits, 'misses': self.misses}
+
+
+_default_cache = None
+
+
+def default_cache() -> ApiResponseCache:
+    """Process-wide cache at DEFAULT_CACHE_PATH"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ApiResponseCache()
+    return _default_cache
@@ -2,9 +2,7 @@
 Test complex causal chains with API models
 """
 
-import os
-from openai import OpenAI
-from anthropic import Anthropic
+from api_harness import chat, run_requests
 
 complex_chains = [
     ("A causes B, B causes C, therefore A causes ___", "C"),
@@ -13,25 +11,12 @@ complex_chains = [
     ("If P then Q, if Q then R, therefore if P then ___", "R"),
 ]
 
-def test_gpt(prompt):
-    client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": f"Complete with one word: {prompt}"}],
-        temperature=0,
-        max_tokens=10
-    )
-    return response.choices[0].message.content.strip()
-
-def test_claude(prompt):
-    client = Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
-    response = client.messages.create(
-        model="claude-3-haiku-20240307",
-        messages=[{"role": "user", "content": f"Complete with one word: {prompt}"}],
-        temperature=0,
-        max_tokens=10
-    )
-    return response.content[0].text.strip()
+# Both models answer every chain concurrently; results come back in chain order
+replies = run_requests([
+    chat(provider, f"Complete with one word: {prompt}", temperature=0, max_tokens=10)
+    for prompt, _ in complex_chains for provider in ('openai', 'anthropic')
+])
+gpt_replies, claude_replies = replies[0::2], replies[1::2]
 
 print("=" * 70)
 print("COMPLEX CAUSAL CHAIN TEST - API MODELS")
@@ -40,29 +25,29 @@ print("=" * 70)
 gpt_score = 0
 claude_score = 0
 
-for prompt, expected in complex_chains:
+for (prompt, expected), gpt_result, claude_result in zip(complex_chains, gpt_replies, claude_replies):
     print(f"\nChain: '{prompt}'")
     print(f"Expected: '{expected}'")
     
-    try:
-        gpt_result = test_gpt(prompt)
+    if isinstance(gpt_result, Exception):
+        print(f"  GPT-3.5: Error - {gpt_result}")
+    else:
+        gpt_result = gpt_result.strip()
         gpt_correct = gpt_result.upper() == expected.upper()
         if gpt_correct:
             gpt_score += 1
         print(f"  GPT-3.5: '{gpt_result}' {'✓' if gpt_correct else '✗'}")
-    except Exception as e:
-        print(f"  GPT-3.5: Error - {e}")
     
-    try:
-        claude_result = test_claude(prompt)
+    if isinstance(claude_result, Exception):
+        print(f"  Claude: Error - {claude_result}")
+    else:
+        claude_result = claude_result.strip()
         # Strip periods from Claude's responses
         claude_clean = claude_result.rstrip('.').upper()
         claude_correct = claude_clean == expected.upper()
         if claude_correct:
             claude_score += 1
         print(f"  Claude: '{claude_result}' {'✓' if claude_correct else '✗'}")
-    except Exception as e:
-        print(f"  Claude: Error - {e}")
 
 print("\n" + "=" * 70)
 print("SCORES:")
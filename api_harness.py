@@ -0,0 +1,223 @@
+"""
+Async harness for the OpenAI and Anthropic chat APIs
+One pooled client per provider, prompts run concurrently under a per-provider
+semaphore, 429/5xx and dropped connections retried with exponential backoff,
+and results returned in the order the requests were given; temperature-0
+replies are kept in api_cache, so reruns replay them
+
+    requests = [chat('openai', prompt, max_tokens=5) for prompt in prompts]
+    replies = run_requests(requests)   # str, or the exception if it kept failing
+"""
+
+import asyncio
+import os
+import random
+from typing import Dict, List, Optional, Sequence, Union
+from api_cache import CACHE_MODES, DEFAULT_MODE, ApiResponseCache, cacheable, default_cache
+
+PROVIDERS = ('openai', 'anthropic')
+
+DEFAULT_MODELS = {
+    'openai': 'gpt-3.5-turbo',
+    'anthropic': 'claude-3-haiku-20240307',
+}
+
+# In-flight requests per provider (API_CONCURRENCY_OPENAI / _ANTHROPIC override)
+DEFAULT_CONCURRENCY = int(os.getenv('API_CONCURRENCY', '8'))
+
+MAX_RETRIES = int(os.getenv('API_MAX_RETRIES', '6'))
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+# The messages API requires max_tokens; chat completions default to the model limit
+ANTHROPIC_MAX_TOKENS = 1024
+
+RETRY_STATUSES = (408, 409, 429)
+
+# Prompt logprobs need echo on the legacy completions endpoint, which only
+# base models serve; the chat endpoints (and Anthropic) only score generated tokens
+LOGPROB_MODEL = os.getenv('API_LOGPROB_MODEL', 'davinci-002')
+
+# 'batch' sends sweeps through the providers' offline batch endpoints (api_batch)
+SUBMIT_MODES = ('interactive', 'batch')
+SUBMIT_MODE = os.getenv('API_SUBMIT_MODE', 'interactive')
+
+
+def chat(provider: str, prompt: Union[str, List[Dict]], model: Optional[str] = None,
+         **params) -> Dict:
+    """A request for run_requests: one user prompt, or a full message list"""
+    if provider not in PROVIDERS:
+        raise ValueError(f"Unknown provider '{provider}', expected one of {PROVIDERS}")
+    messages = [{'role': 'user', 'content': prompt}] if isinstance(prompt, str) else list(prompt)
+    return {
+        'provider': provider,
+        'model': model or DEFAULT_MODELS[provider],
+        'messages': messages,
+        'params': params
+    }
+
+
+def echo_logprobs(prompts: Sequence[str], model: Optional[str] = None) -> Dict:
+    """
+    A scoring request: one legacy-completions call that echoes every prompt
+    with its token logprobs and generates nothing; the reply is, per prompt,
+    a list of [character offset, logprob] per token (the first logprob is None)
+    """
+    return {
+        'provider': 'openai',
+        'kind': 'logprobs',
+        'model': model or LOGPROB_MODEL,
+        'prompt': list(prompts),
+        'params': {'max_tokens': 0, 'echo': True, 'logprobs': 0, 'temperature': 0}
+    }
+
+
+def _retryable(error: Exception) -> bool:
+    status = getattr(error, 'status_code', None)
+    if status is not None:
+        return status in RETRY_STATUSES or status >= 500
+    # Timeouts and dropped connections carry no status
+    return type(error).__name__ in ('APIConnectionError', 'APITimeoutError')
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, 'response', None)
+    value = response.headers.get('retry-after') if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class ApiHarness:
+    """
+    Pooled async clients for both providers
+    Clients are created on first use, so a missing key or SDK only fails the
+    requests that need that provider. The SDKs' own retries are switched off
+    so that backoff happens here, inside the concurrency limit
+    """
+
+    def __init__(self, concurrency: Optional[Dict[str, int]] = None,
+                 max_retries: int = MAX_RETRIES, backoff_base: float = BACKOFF_BASE,
+                 backoff_max: float = BACKOFF_MAX, base_urls: Optional[Dict[str, str]] = None,
+                 cache_mode: str = DEFAULT_MODE, cache: Optional[ApiResponseCache] = None):
+        if cache_mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode '{cache_mode}', expected one of {CACHE_MODES}")
+        self.concurrency = {
+            provider: int(os.getenv(f'API_CONCURRENCY_{provider.upper()}', DEFAULT_CONCURRENCY))
+            for provider in PROVIDERS
+        }
+        self.concurrency.update(concurrency or {})
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # None keeps each SDK's default (or its OPENAI_BASE_URL / ANTHROPIC_BASE_URL)
+        self.base_urls = base_urls or {}
+        self.cache_mode = cache_mode
+        self.cache = None if cache_mode == 'off' else (cache or default_cache())
+        self._clients = {}
+        self._semaphores = {}
+        self.calls = 0
+        self.retries = 0
+
+    def client(self, provider: str):
+        if provider not in self._clients:
+            if provider == 'openai':
+                from openai import AsyncOpenAI
+                self._clients[provider] = AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'), max_retries=0,
+                                                     base_url=self.base_urls.get(provider))
+            elif provider == 'anthropic':
+                from anthropic import AsyncAnthropic
+                self._clients[provider] = AsyncAnthropic(api_key=os.getenv('ANTHROPIC_API_KEY'), max_retries=0,
+                                                        base_url=self.base_urls.get(provider))
+            else:
+                raise ValueError(f"Unknown provider '{provider}', expected one of {PROVIDERS}")
+        return self._clients[provider]
+
+    def _semaphore(self, provider: str) -> asyncio.Semaphore:
+        # Created inside the running loop; one harness serves one asyncio.run
+        if provider not in self._semaphores:
+            self._semaphores[provider] = asyncio.Semaphore(self.concurrency[provider])
+        return self._semaphores[provider]
+
+    async def _call(self, request: Dict):
+        provider = request['provider']
+        client = self.client(provider)
+        self.calls += 1
+
+        if request.get('kind') == 'logprobs':
+            response = await client.completions.create(
+                model=request['model'], prompt=request['prompt'], **request['params']
+            )
+            return [[[offset, log_prob] for offset, log_prob in zip(choice.logprobs.text_offset,
+                                                                    choice.logprobs.token_logprobs)]
+                    for choice in sorted(response.choices, key=lambda choice: choice.index)]
+
+        if provider == 'openai':
+            response = await client.chat.completions.create(
+                model=request['model'], messages=request['messages'], **request['params']
+            )
+            return response.choices[0].message.content
+
+        params = dict(request['params'])
+        params.setdefault('max_tokens', ANTHROPIC_MAX_TOKENS)
+        response = await client.messages.create(
+            model=request['model'], messages=request['messages'], **params
+        )
+        return response.content[0].text
+
+    async def complete(self, request: Dict) -> str:
+        """
+        One request: the cached reply if there is one, else the API, retried
+        with exponential backoff (plus jitter) while the error is retryable
+        """
+        use_cache = self.cache is not None and cacheable(request)
+        if use_cache:
+            reply = self.cache.get(request)
+            if reply is not None:
+                return reply
+        if self.cache_mode == 'cache-only':
+            raise LookupError(f"No cached reply for this {request['provider']} request (cache-only mode)")
+
+        async with self._semaphore(request['provider']):
+            for attempt in range(self.max_retries + 1):
+                try:
+                    reply = await self._call(request)
+                    if use_cache:
+                        self.cache.put(request, reply)
+                    return reply
+                except Exception as e:
+                    if attempt == self.max_retries or not _retryable(e):
+                        raise
+                    delay = _retry_after(e)
+                    if delay is None:
+                        delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+                        delay *= random.uniform(0.5, 1.0)
+                    self.retries += 1
+                    await asyncio.sleep(delay)
+
+    async def run(self, requests: Sequence[Dict]) -> List[Union[str, Exception]]:
+        """All requests concurrently; result i belongs to request i"""
+        try:
+            return await asyncio.gather(*(self.complete(r) for r in requests), return_exceptions=True)
+        finally:
+            await self.close()
+
+    async def close(self):
+        for client in self._clients.values():
+            await client.close()
+        self._clients = {}
+        self._semaphores = {}
+
+
+def run_requests(requests: Sequence[Dict], harness: Optional[ApiHarness] = None,
+                 mode: str = SUBMIT_MODE) -> List[Union[str, Exception]]:
+    """Synchronous entry point for scripts; replies in request order either way"""
+    if mode not in SUBMIT_MODES:
+        raise ValueError(f"Unknown submit mode '{mode}', expected one of {SUBMIT_MODES}")
+    harness = harness or ApiHarness()
+    if mode == 'batch':
+        from api_batch import run_batch
+        return run_batch(requests, base_urls=harness.base_urls, cache_mode=harness.cache_mode,
+                         cache=harness.cache)
+    return asyncio.run(harness.run(requests))
@@ -0,0 +1,76 @@
+"""
+Normal vs violation continuations scored by API token logprobs
+Instead of generating text and string-matching it, each continuation is
+appended to its prompt and the model's own logprobs for the continuation
+tokens give a surprise in nats, the quantity PhysicsViolationDetector
+compares for masked LMs
+
+Both continuations of a test go in the same call (plus other tests' up to
+PROMPTS_PER_CALL texts), and identical texts are only scored once
+"""
+
+from typing import Dict, Optional, Sequence, Tuple
+from api_harness import ApiHarness, echo_logprobs, run_requests
+
+PROMPTS_PER_CALL = 16
+
+
+def _texts(test: Dict) -> Tuple[str, str, str]:
+    """(prefix, normal text, violation text) of a PHYSICS_TESTS entry"""
+    prefix = f"{test['context']}\n{test['prompt']}"
+    return prefix, f"{prefix} {test['normal_completion']}", f"{prefix} {test['violation_completion']}"
+
+
+def continuation_surprise(tokens: Sequence[Sequence], prefix_length: int) -> Tuple[float, int]:
+    """(-sum of logprobs, token count) over the tokens starting at or after prefix_length"""
+    log_probs = [log_prob for offset, log_prob in tokens if offset >= prefix_length and log_prob is not None]
+    return -sum(log_probs), len(log_probs)
+
+
+def score_continuations(tests: Dict[str, Dict], model: Optional[str] = None,
+                        harness: Optional[ApiHarness] = None,
+                        prompts_per_call: int = PROMPTS_PER_CALL) -> Dict[str, Dict]:
+    """
+    test name -> the detector's pair result (normal_surprise, violation_surprise,
+    difference, detects_violation) plus token counts and the per-token
+    difference, since the two continuations rarely have the same length;
+    tests whose call failed get {'error': message}
+    """
+    texts = {name: _texts(test) for name, test in tests.items()}
+    # Pack whole tests into calls, skipping texts an earlier test already sent
+    chunks = [[]]
+    seen = set()
+    for _, normal, violation in texts.values():
+        new = [text for text in dict.fromkeys((normal, violation)) if text not in seen]
+        if chunks[-1] and len(chunks[-1]) + len(new) > prompts_per_call:
+            chunks.append([])
+        chunks[-1].extend(new)
+        seen.update(new)
+    chunks = [chunk for chunk in chunks if chunk]
+    replies = run_requests([echo_logprobs(chunk, model) for chunk in chunks], harness, mode='interactive')
+
+    scored = {}
+    for chunk, reply in zip(chunks, replies):
+        for i, text in enumerate(chunk):
+            scored[text] = reply if isinstance(reply, Exception) else reply[i]
+
+    results = {}
+    for name, (prefix, normal, violation) in texts.items():
+        failed = next((scored[t] for t in (normal, violation) if isinstance(scored[t], Exception)), None)
+        if failed is not None:
+            results[name] = {'error': str(failed)}
+            continue
+
+        normal_surprise, normal_tokens = continuation_surprise(scored[normal], len(prefix))
+        violation_surprise, violation_tokens = continuation_surprise(scored[violation], len(prefix))
+        results[name] = {
+            'normal_surprise': normal_surprise,
+            'violation_surprise': violation_surprise,
+            'difference': violation_surprise - normal_surprise,
+            'detects_violation': violation_surprise > normal_surprise,
+            'normal_tokens': normal_tokens,
+            'violation_tokens': violation_tokens,
+            'difference_per_token': violation_surprise / max(violation_tokens, 1)
+                                    - normal_surprise / max(normal_tokens, 1)
+        }
+    return results
@@ -0,0 +1,142 @@
+"""
+Causal-LM scoring of candidate continuations with a shared prefix
+The prefix runs through the model once; its key/value cache is then expanded
+(as views, without copying) across a batch of candidates, so k continuations
+cost one prefix pass plus short suffix passes instead of k full passes
+
+    scorer = CausalLMScorer('gpt2')
+    scorer.score("The apple fell from the tree", ["to the ground", "into the sky"])
+"""
+
+import torch
+from typing import Dict, List, Sequence, Tuple
+from mlm_scoring import TOP_K, gather_log_probs, pad_sequences, target_ranks
+import model_registry
+
+
+def expand_past(past_key_values, batch: int):
+    """A batch-1 key/value cache broadcast to batch rows (legacy tuples or a Cache object)"""
+    legacy = past_key_values.to_legacy_cache() if hasattr(past_key_values, 'to_legacy_cache') else past_key_values
+    expanded = tuple(
+        tuple(tensor.expand(batch, *tensor.shape[1:]) for tensor in layer)
+        for layer in legacy
+    )
+    if hasattr(past_key_values, 'to_legacy_cache'):
+        return type(past_key_values).from_legacy_cache(expanded)
+    return expanded
+
+
+class CausalLMScorer:
+    """
+    Log probabilities of continuations given a prefix, for one autoregressive checkpoint
+    The last prefix's state is kept, so scoring and top_next on the same
+    prefix share a single prefix pass
+    """
+
+    def __init__(self, model_name: str = 'gpt2', batch_size: int = 32):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self._state = None
+
+    def load(self):
+        return model_registry.get_causal_model(self.model_name)
+
+    def _prefix_state(self, prefix: str) -> Tuple[List[int], object, torch.Tensor]:
+        """(prefix ids, key/value cache, logits of the next token) for prefix"""
+        if self._state is not None and self._state[0] == prefix:
+            return self._state[1:]
+
+        tokenizer, model = self.load()
+        prefix_ids = tokenizer.encode(prefix.rstrip(), add_special_tokens=False)
+        # BOS only where the tokenizer would add one itself (not gpt2); never EOS
+        wrapped = tokenizer.build_inputs_with_special_tokens([])
+        if tokenizer.bos_token_id is not None and wrapped[:1] == [tokenizer.bos_token_id]:
+            prefix_ids = [tokenizer.bos_token_id] + prefix_ids
+        if not prefix_ids:
+            raise ValueError("Continuations need a non-empty prefix")
+        with torch.no_grad():
+            outputs = model(torch.tensor([prefix_ids]), use_cache=True)
+        self._state = (prefix, prefix_ids, outputs.past_key_values, outputs.logits[0, -1])
+        return self._state[1:]
+
+    def continuation_ids(self, continuation: str) -> List[int]:
+        """Pieces of a continuation as it follows the prefix (after a space)"""
+        tokenizer, _ = self.load()
+        ids = tokenizer.encode(' ' + continuation.strip(), add_special_tokens=False)
+        if not ids:
+            raise ValueError(f"Continuation '{continuation}' has no tokens")
+        return ids
+
+    def score(self, prefix: str, continuations: Sequence[str]) -> List[Dict]:
+        """
+        Per continuation: total log prob, surprise (its negation, in nats),
+        surprise per token, piece count and the vocabulary rank of its first piece
+        """
+        tokenizer, model = self.load()
+        prefix_ids, past, next_logits = self._prefix_state(prefix)
+        pieces = [self.continuation_ids(c) for c in continuations]
+
+        # First pieces come straight from the prefix pass
+        first = torch.tensor([[ids[0]] for ids in pieces])
+        expanded_logits = next_logits.expand(len(pieces), -1)
+        totals = gather_log_probs(expanded_logits, first)[:, 0].tolist()
+        ranks = target_ranks(expanded_logits, first)[:, 0].tolist()
+
+        # Later pieces need the suffix run on top of the prefix cache; the last
+        # piece is only ever predicted, never fed in
+        longer = [i for i, ids in enumerate(pieces) if len(ids) > 1]
+        pad_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+        for start in range(0, len(longer), self.batch_size):
+            batch = longer[start:start + self.batch_size]
+            inputs = pad_sequences([pieces[i][:-1] for i in batch], pad_id)
+            width = inputs['input_ids'].shape[1]
+            attention_mask = torch.cat(
+                [torch.ones((len(batch), len(prefix_ids)), dtype=torch.long), inputs['attention_mask']], dim=1
+            )
+            position_ids = torch.arange(len(prefix_ids), len(prefix_ids) + width).expand(len(batch), -1)
+            with torch.no_grad():
+                logits = model(
+                    input_ids=inputs['input_ids'],
+                    attention_mask=attention_mask,
+                    position_ids=position_ids,
+                    past_key_values=expand_past(past, len(batch)),
+                    use_cache=False
+                ).logits
+
+            for row, i in enumerate(batch):
+                targets = torch.tensor(pieces[i][1:]).unsqueeze(-1)
+                step_logits = logits[row, :len(pieces[i]) - 1]
+                totals[i] += gather_log_probs(step_logits, targets).sum().item()
+
+        return [
+            {
+                'continuation': continuation,
+                'tokens': tokenizer.convert_ids_to_tokens(ids),
+                'log_prob': total,
+                'surprise': -total,
+                'surprise_per_token': -total / len(ids),
+                'first_rank': rank
+            }
+            for continuation, ids, total, rank in zip(continuations, pieces, totals, ranks)
+        ]
+
+    def compare(self, prefix: str, normal: str, violation: str) -> Dict:
+        """PhysicsViolationDetector's pair result for two continuations of prefix"""
+        normal_result, violation_result = self.score(prefix, [normal, violation])
+        normal_surprise = normal_result['surprise']
+        violation_surprise = violation_result['surprise']
+        return {
+            'normal_surprise': normal_surprise,
+            'violation_surprise': violation_surprise,
+            'difference': violation_surprise - normal_surprise,
+            'detects_violation': violation_surprise > normal_surprise
+        }
+
+    def top_next(self, prefix: str, k: int = TOP_K) -> List[Tuple[str, float]]:
+        """The k likeliest next tokens (decoded, stripped) with their log probs"""
+        tokenizer, _ = self.load()
+        _, _, next_logits = self._prefix_state(prefix)
+        log_probs = torch.log_softmax(next_logits, dim=-1)
+        top_log_probs, top_ids = log_probs.topk(k)
+        return [(tokenizer.decode([token_id]).strip(), log_prob)
+                for token_id, log_prob in zip(top_ids.tolist(), top_log_probs.tolist())]
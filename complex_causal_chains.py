@@ -3,11 +3,14 @@ Test if models can handle multi-step causal reasoning
 Based on Pearl (2009) causal graphs
 """
 
-from transformers import AutoModelForMaskedLM, AutoTokenizer
-import torch
+from causal_scoring import CausalLMScorer
+from mlm_scoring import MaskedLMScorer
 
 models = ['bert-base-uncased', 'roberta-base', 'gpt2']
 
+# Autoregressive checkpoints, scored by continuing the text before [MASK]
+CAUSAL_MODELS = ['gpt2']
+
 complex_chains = [
     # (test, expected, chain_length)
     ("A causes B, B causes C, therefore A causes [MASK]", "c", 3),
@@ -20,44 +23,54 @@ print("=" * 70)
 print("COMPLEX CAUSAL CHAIN TEST")
 print("=" * 70)
 
+scorer = MaskedLMScorer([m for m in models if m not in CAUSAL_MODELS])
+table = scorer.score([test for test, _, _ in complex_chains],
+                     [[expected] for _, expected, _ in complex_chains])
+
 for model_name in models:
-    if model_name == 'gpt2':
-        print(f"\n{model_name}: [Generation model - skipping MLM test]")
-        continue
-        
-    print(f"\n{model_name}:")
-    print("-" * 40)
-    
-    try:
-        tokenizer = AutoTokenizer.from_pretrained(model_name)
-        model = AutoModelForMaskedLM.from_pretrained(model_name)
-        model.eval()
-        
+    if model_name in CAUSAL_MODELS:
+        # The chains end in [MASK], so the text before it is the prefix to continue
+        print(f"\n{model_name} (next-token prediction):")
+        print("-" * 40)
+        causal = CausalLMScorer(model_name)
         correct = 0
         for test, expected, chain_len in complex_chains:
-            # Adjust mask token
-            mask_token = '<mask>' if 'roberta' in model_name else '[MASK]'
-            test = test.replace('[MASK]', mask_token)
-            
-            inputs = tokenizer(test, return_tensors='pt')
-            with torch.no_grad():
-                outputs = model(**inputs)
-            
-            mask_idx = (inputs['input_ids'] == tokenizer.mask_token_id).nonzero()[0,1]
-            probs = torch.softmax(outputs.logits[0, mask_idx], dim=-1)
-            top_word = tokenizer.decode([probs.argmax().item()]).strip()
+            prefix = test.split('[MASK]')[0]
+            top_word = causal.top_next(prefix, k=1)[0][0]
+            (result,) = causal.score(prefix, [expected])
             
             is_correct = top_word.lower() == expected.lower()
             if is_correct:
                 correct += 1
             
             symbol = "✓" if is_correct else "✗"
-            print(f"  {symbol} Chain-{chain_len}: got '{top_word}' (expected '{expected}')")
+            print(f"  {symbol} Chain-{chain_len}: got '{top_word}' (expected '{expected}', "
+                  f"surprise {result['surprise']:.2f})")
         
         print(f"  Score: {correct}/{len(complex_chains)}")
+        continue
         
-    except Exception as e:
-        print(f"  Error: {e}")
+    print(f"\n{model_name}:")
+    print("-" * 40)
+    
+    model_table = table[table['model'] == model_name]
+    if model_table.empty:
+        print("  Error: model could not be scored")
+        continue
+    
+    correct = 0
+    for row in model_table.itertuples():
+        chain_len = complex_chains[row.stimulus_id][2]
+        top_word = row.top_prediction
+        
+        is_correct = top_word.lower() == row.target.lower()
+        if is_correct:
+            correct += 1
+        
+        symbol = "✓" if is_correct else "✗"
+        print(f"  {symbol} Chain-{chain_len}: got '{top_word}' (expected '{row.target}')")
+    
+    print(f"  Score: {correct}/{len(complex_chains)}")
 
 print("\n" + "=" * 70)
 print("If models fail at multi-step chains, they lack")
@@ -3,8 +3,8 @@ Test positional encoding in multilingual models
 Different languages have different word orders!
 """
 
-from transformers import AutoModelForMaskedLM, AutoTokenizer
-import torch
+import math
+from mlm_scoring import MaskedLMScorer
 
 print("=" * 70)
 print("CROSS-LINGUISTIC POSITIONAL ENCODING TEST")
@@ -13,10 +13,9 @@ print("=" * 70)
 # We can test with mBERT (multilingual BERT)
 model_name = 'bert-base-multilingual-cased'
 
+scorer = MaskedLMScorer([model_name])
 try:
-    tokenizer = AutoTokenizer.from_pretrained(model_name)
-    model = AutoModelForMaskedLM.from_pretrained(model_name)
-    model.eval()
+    tokenizer, model = scorer.load(model_name)
     print(f"✓ Loaded {model_name}")
 except:
     print(f"✗ Need to download {model_name} first")
@@ -64,23 +63,19 @@ test_sentences = {
 print("\nTesting function words across languages:")
 print("-" * 40)
 
-for lang, test_data in test_sentences.items():
+sentences = [test_data['sentence'] for test_data in test_sentences.values()]
+entries = scorer.score_entries(model_name, sentences, [[] for _ in sentences])
+
+for (lang, test_data), entry in zip(test_sentences.items(), entries):
     sentence = test_data['sentence']
     
-    inputs = tokenizer(sentence, return_tensors='pt')
-    with torch.no_grad():
-        outputs = model(**inputs)
-    
-    mask_idx = (inputs['input_ids'] == tokenizer.mask_token_id).nonzero()[0,1]
-    probs = torch.softmax(outputs.logits[0, mask_idx], dim=-1)
-    
-    top5 = torch.topk(probs, 5)
-    predictions = [tokenizer.decode([idx]) for idx in top5.indices]
+    top5 = entry['top_k'][:5]
+    predictions = [tokenizer.decode([idx]) for idx, _ in top5]
     
     print(f"\n{lang}:")
     print(f"  Sentence: {sentence}")
     print(f"  Top predictions: {', '.join(predictions[:3])}")
-    print(f"  Confidence: {top5.values[0]:.3f}")
+    print(f"  Confidence: {math.exp(top5[0][1]):.3f}")
 
 print("\n" + "=" * 70)
 print("If function words dominate across languages,")
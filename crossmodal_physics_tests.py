@@ -41,14 +41,13 @@ VISUAL_TESTS = {
     }
 }
 
+pairs = [(t['normal'], t['violation'], t['target']) for t in VISUAL_TESTS.values()]
+pair_results = dict(zip(VISUAL_TESTS, detector.test_violation_pairs(pairs)))
+
 visual_results = {}
 for test_name, test_data in VISUAL_TESTS.items():
     print(f"\n{test_name.replace('_', ' ').upper()}")
-    result = detector.test_violation_pair(
-        test_data['normal'],
-        test_data['violation'],
-        test_data['target']
-    )
+    result = pair_results[test_name]
     visual_results[test_name] = result['difference']
     print(f"Difference: {result['difference']:.3f} ({'✓' if result['difference'] > 0 else '✗'})")
 
@@ -3,26 +3,20 @@ Can we exploit positional encoding for better prompting?
 Test different prompt structures based on our findings
 """
 
-from transformers import AutoModelForMaskedLM, AutoTokenizer
-import torch
+import math
+from mlm_scoring import MaskedLMScorer
 
-tokenizer = AutoTokenizer.from_pretrained('bert-base-uncased')
-model = AutoModelForMaskedLM.from_pretrained('bert-base-uncased')
-model.eval()
+scorer = MaskedLMScorer(['bert-base-uncased'])
+tokenizer = scorer.tokenizer('bert-base-uncased')
 
 def test_prompt_structure(prompt, mask_position):
     """Test how well model predicts based on position"""
-    inputs = tokenizer(prompt, return_tensors='pt')
-    with torch.no_grad():
-        outputs = model(**inputs)
+    entry = scorer.score_entries('bert-base-uncased', [prompt], [[]])[0]
     
-    mask_idx = (inputs['input_ids'] == tokenizer.mask_token_id).nonzero()[0,1]
-    probs = torch.softmax(outputs.logits[0, mask_idx], dim=-1)
-    
-    # Get top 5 predictions
-    top5 = torch.topk(probs, 5)
-    predictions = [tokenizer.decode([idx]) for idx in top5.indices]
-    return predictions, top5.values.tolist()
+    # Get top 5 predictions (log probs from the shared log-softmax path)
+    top5 = entry['top_k'][:5]
+    predictions = [tokenizer.decode([idx]) for idx, _ in top5]
+    return predictions, [math.exp(log_prob) for _, log_prob in top5]
 
 print("=" * 70)
 print("EXPLOITING POSITIONAL ENCODING FOR BETTER PROMPTING")
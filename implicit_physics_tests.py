@@ -46,14 +46,13 @@ IMPLICIT_TESTS = {
     }
 }
 
+pairs = [(t['normal'], t['violation'], t['target']) for t in IMPLICIT_TESTS.values()]
+pair_results = dict(zip(IMPLICIT_TESTS, detector.test_violation_pairs(pairs)))
+
 implicit_results = {}
 for test_name, test_data in IMPLICIT_TESTS.items():
     print(f"\n{test_name.replace('_', ' ').upper()}")
-    result = detector.test_violation_pair(
-        test_data['normal'],
-        test_data['violation'],
-        test_data['target']
-    )
+    result = pair_results[test_name]
     implicit_results[test_name] = result['difference']
     print(f"Difference: {result['difference']:.3f} ({'✓' if result['difference'] > 0 else '✗'})")
 
@@ -3,33 +3,16 @@ Is positional encoding unique to physics or universal?
 Testing social, mathematical, and causal knowledge
 """
 
-from transformers import AutoModelForMaskedLM, AutoTokenizer
-import torch
+from positional_masking import score_positions
 
-tokenizer = AutoTokenizer.from_pretrained('bert-base-uncased')
-model = AutoModelForMaskedLM.from_pretrained('bert-base-uncased')
-model.eval()
-
-def test_position(sentence, word_type_labels):
-    """Test which positions are well-predicted"""
-    words = sentence.split()
+def test_position(sentence_table, word_type_labels):
+    """Group one sentence's positional ranks by word type"""
     results = {}
     
-    for i, (word, label) in enumerate(zip(words, word_type_labels)):
-        masked = ' '.join([w if j != i else '[MASK]' for j, w in enumerate(words)])
-        
-        inputs = tokenizer(masked, return_tensors='pt')
-        with torch.no_grad():
-            outputs = model(**inputs)
-        
-        mask_idx = (inputs['input_ids'] == tokenizer.mask_token_id).nonzero()[0,1]
-        target_id = tokenizer.encode(word, add_special_tokens=False)[0]
-        
-        probs = torch.softmax(outputs.logits[0, mask_idx], dim=-1)
-        rank = (probs.argsort(descending=True) == target_id).nonzero().item()
-        
+    for row, label in zip(sentence_table.itertuples(), word_type_labels):
+        rank = row.target_rank
         results[label] = results.get(label, []) + [rank]
-        print(f"  {word:15s} ({label:10s}): rank {rank}")
+        print(f"  {row.word:15s} ({label:10s}): rank {rank}")
     
     return results
 
@@ -57,11 +40,14 @@ tests = {
     )
 }
 
+# Every position of every sentence is masked and scored in one batched sweep
+position_table = score_positions([sentence for sentence, _ in tests.values()])
+
 all_results = {}
-for domain, (sentence, labels) in tests.items():
+for sentence_id, (domain, (sentence, labels)) in enumerate(tests.items()):
     print(f"\n{domain}:")
     print(f"Sentence: {sentence}")
-    results = test_position(sentence, labels)
+    results = test_position(position_table[position_table['sentence_id'] == sentence_id], labels)
     all_results[domain] = results
 
 print("\n" + "=" * 70)
@@ -3,14 +3,14 @@ Does word frequency predict positional encoding success?
 Using Zipf frequency as proxy for corpus frequency
 """
 
-from transformers import AutoModelForMaskedLM, AutoTokenizer
-import torch
 import numpy as np
 from scipy import stats
+from mlm_scoring import MaskedLMScorer
+from slot_templates import SlotTemplate
+from target_vocab import resolver
 
-tokenizer = AutoTokenizer.from_pretrained('bert-base-uncased')
-model = AutoModelForMaskedLM.from_pretrained('bert-base-uncased')
-model.eval()
+scorer = MaskedLMScorer(['bert-base-uncased'])
+tokenizer = scorer.tokenizer('bert-base-uncased')
 
 print("=" * 70)
 print("LEXICAL FREQUENCY VS POSITIONAL ENCODING")
@@ -24,25 +24,16 @@ test_sets = {
     'LOW_FREQ_VERBS': ['hypothesize', 'crystallize', 'metabolize', 'polarize', 'oxidize']
 }
 
-def test_word_prediction(word, context_template):
-    """Test how well a word is predicted in context"""
-    sentence = context_template.replace('[WORD]', word)
-    masked = sentence.replace(word, '[MASK]')
-    
-    inputs = tokenizer(masked, return_tensors='pt')
-    with torch.no_grad():
-        outputs = model(**inputs)
-    
-    mask_idx = (inputs['input_ids'] == tokenizer.mask_token_id).nonzero()[0,1]
-    target_id = tokenizer.encode(word, add_special_tokens=False)[0]
-    
-    probs = torch.softmax(outputs.logits[0, mask_idx], dim=-1)
-    rank = (probs.argsort(descending=True) == target_id).nonzero().item()
+def test_word_prediction(words, context_template):
+    """Test how well each word is predicted in context, masked at the [WORD] slot"""
+    template = SlotTemplate(tokenizer, context_template, masked_slot='WORD')
+    _, sequences, positions = template.product({'WORD': words})
+    target_ids = [resolver(tokenizer).first_id(word) for word in words]
+    entries = scorer.score_encoded_entries('bert-base-uncased', sequences, positions,
+                                           [[t] for t in target_ids])
     
     # Use token ID as frequency proxy (lower ID = higher frequency generally)
-    frequency_proxy = 30000 - target_id
-    
-    return rank, frequency_proxy
+    return [(entry['targets'][t][1], 30000 - t) for entry, t in zip(entries, target_ids)]
 
 print("\nTesting different frequency words:\n")
 
@@ -58,8 +49,7 @@ for category, words in test_sets.items():
     else:  # VERBS
         context = "They [WORD] quickly"
     
-    for word in words:
-        rank, freq = test_word_prediction(word, context)
+    for word, (rank, freq) in zip(words, test_word_prediction(words, context)):
         ranks.append(rank)
         frequencies.append(freq)
         print(f"  {word:15s}: rank {rank:4d}, freq_proxy {freq:5d}")
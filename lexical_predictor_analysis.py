@@ -6,21 +6,39 @@ REFERENCES:
 - McCoy et al. (2019) "Right for the Wrong Reasons" - BERT heuristics
 """
 
-import torch
-from transformers import AutoModelForMaskedLM, AutoTokenizer
+from mlm_scoring import MaskedLMScorer
+from slot_templates import SlotTemplate
+from target_vocab import resolver
 import numpy as np
 from scipy import stats
 import matplotlib.pyplot as plt
 
 class LexicalPredictorAnalysis:
     def __init__(self):
-        self.tokenizer = AutoTokenizer.from_pretrained('bert-base-uncased')
-        self.model = AutoModelForMaskedLM.from_pretrained('bert-base-uncased')
-        self.model.eval()
+        self.scorer = MaskedLMScorer(['bert-base-uncased'])
+        self.tokenizer = self.scorer.tokenizer('bert-base-uncased')
+        self.targets = resolver(self.tokenizer)
+    
+    def surprisals(self, masked_sentences, targets):
+        """
+        Exact surprisal (nats) of each target's first sub-token at the [MASK]
+        All sentences are scored together through the shared log-softmax gather
+        """
+        target_ids = [self.targets.first_id(t) for t in targets]
+        entries = self.scorer.score_entries('bert-base-uncased', masked_sentences, [[t] for t in target_ids])
+        return [-entry['targets'][t][0] for entry, t in zip(entries, target_ids)]
+    
+    def template_surprisals(self, template, fillers, target):
+        """surprisals for every filler combination of a SlotTemplate, spliced rather than re-tokenized"""
+        _, sequences, positions = template.product(fillers)
+        target_id = self.targets.first_id(target)
+        entries = self.scorer.score_encoded_entries('bert-base-uncased', sequences, positions,
+                                                    [[target_id]] * len(sequences))
+        return [-entry['targets'][target_id][0] for entry in entries]
         
     def get_word_frequency(self, word):
         """Get BERT vocabulary frequency as proxy for corpus frequency"""
-        token_id = self.tokenizer.encode(word, add_special_tokens=False)[0]
+        token_id = self.targets.first_id(word)
         # Lower token IDs generally = more frequent words
         return 30000 - token_id  # Invert so higher = more frequent
     
@@ -43,25 +61,17 @@ class LexicalPredictorAnalysis:
             ("The item soared skyward", "The thing rose", "fancy_up"),
         ]
         
+        # Test both sentences with [MASK] at the object word ("object", "item", "thing")
+        stimuli = [(sent, key) for sent1, sent2, key in gravity_variants for sent in [sent1, sent2]]
+        targets = [sent.split()[1] for sent, _ in stimuli]
+        surprises = self.surprisals(
+            [sent.replace(target, '[MASK]') for (sent, _), target in zip(stimuli, targets)], targets
+        )
+        
         results = {}
-        for sent1, sent2, key in gravity_variants:
-            # Test both sentences with [MASK] 
-            for sent in [sent1, sent2]:
-                words = sent.split()
-                target = words[1]  # "object", "item", "thing"
-                masked = sent.replace(target, '[MASK]')
-                
-                inputs = self.tokenizer(masked, return_tensors='pt')
-                with torch.no_grad():
-                    outputs = self.model(**inputs)
-                    
-                mask_idx = (inputs['input_ids'] == self.tokenizer.mask_token_id).nonzero()[0,1]
-                target_id = self.tokenizer.encode(target, add_special_tokens=False)[0]
-                probs = torch.softmax(outputs.logits[0, mask_idx], dim=-1)
-                surprise = -torch.log(probs[target_id]).item()
-                
-                results[f"{key}_{sent[:10]}"] = surprise
-                print(f"{sent[:30]:30s} -> surprise: {surprise:.3f}")
+        for (sent, key), surprise in zip(stimuli, surprises):
+            results[f"{key}_{sent[:10]}"] = surprise
+            print(f"{sent[:30]:30s} -> surprise: {surprise:.3f}")
         
         # EXPERIMENT 2: Adverb effects
         print("\n2. ADVERB MANIPULATION")
@@ -76,23 +86,11 @@ class LexicalPredictorAnalysis:
         adverb_effects = {}
         for template, adverbs in adverb_tests:
             print(f"\nTemplate: {template}")
-            for adv in adverbs:
-                sent = template.replace("[ADV]", adv)
-                # Get surprise at object word
-                words = sent.split()
-                target = words[1]  # ball/water/rock
-                
-                masked = ' '.join([w if w != target else '[MASK]' for w in words])
-                inputs = self.tokenizer(masked, return_tensors='pt')
-                
-                with torch.no_grad():
-                    outputs = self.model(**inputs)
-                    
-                mask_idx = (inputs['input_ids'] == self.tokenizer.mask_token_id).nonzero()[0,1]
-                target_id = self.tokenizer.encode(target, add_special_tokens=False)[0]
-                probs = torch.softmax(outputs.logits[0, mask_idx], dim=-1)
-                surprise = -torch.log(probs[target_id]).item()
-                
+            # Get surprise at object word (ball/water/rock), spliced for every adverb
+            target = template.split()[1]
+            masked = SlotTemplate(self.tokenizer, template.replace(target, '[MASK]', 1))
+            surprises = self.template_surprisals(masked, {'ADV': adverbs}, target)
+            for adv, surprise in zip(adverbs, surprises):
                 adv_display = adv if adv else "[none]"
                 print(f"  {adv_display:15s}: {surprise:.3f}")
                 adverb_effects[f"{template[:15]}_{adv}"] = surprise
@@ -137,20 +135,16 @@ class LexicalPredictorAnalysis:
             ("The ice [MASK] near the freezer", "melted", ["strangely", "beautifully", ""]),
         ]
         
+        surprises = iter(self.surprisals(
+            [template.replace("[MASK]", f"{mod} [MASK]" if mod else "[MASK]")
+             for template, _, modifiers in valence_tests for mod in modifiers],
+            [target for _, target, modifiers in valence_tests for _ in modifiers]
+        ))
+        
         for template, target, modifiers in valence_tests:
             print(f"\n'{target}' in: {template[:30]}...")
             for mod in modifiers:
-                sent = template.replace("[MASK]", f"{mod} [MASK]" if mod else "[MASK]")
-                
-                inputs = self.tokenizer(sent, return_tensors='pt')
-                with torch.no_grad():
-                    outputs = self.model(**inputs)
-                    
-                mask_idx = (inputs['input_ids'] == self.tokenizer.mask_token_id).nonzero()[0,1]
-                target_id = self.tokenizer.encode(target, add_special_tokens=False)[0]
-                probs = torch.softmax(outputs.logits[0, mask_idx], dim=-1)
-                surprise = -torch.log(probs[target_id] + 1e-10).item()
-                
+                surprise = next(surprises)
                 mod_display = mod if mod else "[neutral]"
                 print(f"  {mod_display:10s}: {surprise:.3f}")
         
@@ -0,0 +1,181 @@
+"""
+Persistent on-disk cache of masked-LM outputs
+Entries are content-addressed by model, revision, tokenizer and exact input ids,
+so reruns of deterministic forward passes never touch the model
+"""
+
+from transformers import AutoConfig
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Optional, Sequence
+import model_registry
+
+DEFAULT_CACHE_PATH = os.getenv(
+    'MLM_CACHE_PATH',
+    os.path.join(os.path.expanduser('~'), '.cache', 'embodied-cognition', 'mlm_outputs.sqlite')
+)
+
+
+def model_fingerprint(model_name: str, tokenizer, revision: Optional[str] = None,
+                      variant: Optional[str] = None) -> str:
+    """
+    Identify a (checkpoint, revision, tokenizer, variant) combination
+    The hub commit hash is read from the config when no revision is given;
+    variant keeps e.g. int8-quantized outputs apart from fp32 ones, and is
+    resolved to model_registry.DEFAULT_VARIANT (MLM_VARIANT) when not given,
+    so outputs of different variants never share a key
+    """
+    variant = variant or model_registry.DEFAULT_VARIANT
+    if revision is None:
+        try:
+            revision = getattr(AutoConfig.from_pretrained(model_name), '_commit_hash', None)
+        except Exception:
+            revision = None
+
+    vocab = sorted(tokenizer.get_vocab().items())
+    vocab_hash = hashlib.sha256(json.dumps(vocab).encode()).hexdigest()
+    return json.dumps({
+        'model': model_name,
+        'revision': revision or 'unknown',
+        'tokenizer': type(tokenizer).__name__,
+        'vocab': vocab_hash,
+        'variant': variant
+    }, sort_keys=True)
+
+
+class MLMOutputCache:
+    """
+    SQLite store of log-probabilities at a masked position
+    Each entry keeps the requested targets (log prob and rank), the top-k tokens
+    and, once asked for, the probability mass on each token class; candidate-only
+    scores (no top-k) are kept apart, per candidate id
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS outputs ("
+                "key TEXT PRIMARY KEY, fingerprint TEXT, payload TEXT)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS candidates ("
+                "key TEXT PRIMARY KEY, fingerprint TEXT, payload TEXT)"
+            )
+
+    @staticmethod
+    def entry_key(fingerprint: str, input_ids: Sequence[int], mask_position: int) -> str:
+        """Content address of one masked input"""
+        material = json.dumps([fingerprint, list(input_ids), int(mask_position)])
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    @staticmethod
+    def candidate_key(fingerprint: str, input_ids: Sequence[int], mask_position: int,
+                      normalize: bool = True) -> str:
+        """Content address of candidate scores at one masked input (log probs or raw logits)"""
+        material = json.dumps([fingerprint, list(input_ids), int(mask_position), bool(normalize)])
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def _select(self, table: str, keys: Sequence[str]) -> Dict[str, str]:
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = list(keys[start:start + 500])
+                placeholders = ','.join('?' * len(chunk))
+                cursor = self._conn.execute(
+                    f"SELECT key, payload FROM {table} WHERE key IN ({placeholders})", chunk
+                )
+                found.update(cursor)
+        return found
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, Dict]:
+        """Cached entries for whichever keys are present"""
+        return {key: _decode_entry(payload) for key, payload in self._select('outputs', keys).items()}
+
+    def put_many(self, fingerprint: str, entries: Dict[str, Dict]):
+        """Store entries, merging target scores into anything already cached"""
+        existing = self.get_many(list(entries))
+        rows = []
+        for key, entry in entries.items():
+            if key in existing:
+                merged = dict(existing[key]['targets'])
+                merged.update(entry['targets'])
+                entry = {**existing[key], **entry, 'targets': merged}
+            rows.append((key, fingerprint, _encode_entry(entry)))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO outputs (key, fingerprint, payload) VALUES (?, ?, ?)", rows
+            )
+
+    def get_candidates(self, keys: Sequence[str]) -> Dict[str, Dict[int, float]]:
+        """Cached candidate scores (candidate id -> score) for whichever keys are present"""
+        return {key: {t: score for t, score in json.loads(payload)}
+                for key, payload in self._select('candidates', keys).items()}
+
+    def put_candidates(self, fingerprint: str, entries: Dict[str, Dict[int, float]]):
+        """Store candidate scores, merging them into any already cached for the same input"""
+        existing = self.get_candidates(list(entries))
+        rows = [
+            (key, fingerprint, json.dumps(list({**existing.get(key, {}), **scores}.items())))
+            for key, scores in entries.items()
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO candidates (key, fingerprint, payload) VALUES (?, ?, ?)", rows
+            )
+
+    def clear(self, fingerprint: Optional[str] = None):
+        """Drop every entry, or only those of one model fingerprint"""
+        with self._lock, self._conn:
+            for table in ('outputs', 'candidates'):
+                if fingerprint is None:
+                    self._conn.execute(f"DELETE FROM {table}")
+                else:
+                    self._conn.execute(f"DELETE FROM {table} WHERE fingerprint = ?", (fingerprint,))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM outputs").fetchone()
+            (candidates,) = self._conn.execute("SELECT COUNT(*) FROM candidates").fetchone()
+        return {'entries': size, 'candidate_entries': candidates, 'hits': self.hits, 'misses': self.misses}
+
+
+_default_cache = None
+
+
+def default_cache() -> MLMOutputCache:
+    """Process-wide cache at DEFAULT_CACHE_PATH"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = MLMOutputCache()
+    return _default_cache
+
+
+def _encode_entry(entry: Dict) -> str:
+    raw = {
+        'targets': [[t, lp, rank] for t, (lp, rank) in entry['targets'].items()],
+        'top_k': [list(pair) for pair in entry['top_k']]
+    }
+    if 'class_mass' in entry:
+        raw['class_mass'] = entry['class_mass']
+    return json.dumps(raw)
+
+
+def _decode_entry(payload: str) -> Dict:
+    raw = json.loads(payload)
+    entry = {
+        'targets': {t: (lp, rank) for t, lp, rank in raw['targets']},
+        'top_k': [tuple(pair) for pair in raw['top_k']]
+    }
+    if 'class_mass' in raw:
+        entry['class_mass'] = raw['class_mass']
+    return entry
@@ -0,0 +1,720 @@
+"""
+Shared masked-LM scoring engine for multi-model sweeps
+Loads each checkpoint once and scores every stimulus in padded batches
+"""
+
+import torch
+import numpy as np
+import pandas as pd
+from transformers.activations import gelu
+from functools import partial
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from mlm_cache import MLMOutputCache, default_cache, model_fingerprint
+from target_vocab import resolver
+from token_classes import TOKEN_CLASSES, TokenClassMasks, token_classes
+import model_registry
+
+# Stimuli are written with BERT's mask token and swapped per model
+MASK_PLACEHOLDER = '[MASK]'
+
+LOCAL_MODELS = [
+    'bert-base-uncased',
+    'roberta-base',
+    'albert-base-v2',
+    'distilbert-base-uncased'
+]
+
+# Top tokens kept for every scored (and cached) masked position
+TOP_K = 10
+
+SPAN_MODES = ('pll', 'chain', 'joint')
+
+# Padded tokens (rows x longest row) allowed in one forward pass
+MAX_BATCH_TOKENS = 4096
+
+# top_class is the token class of the top prediction (see token_classes);
+# <class>_mass the total probability the model puts on that class at the mask;
+# target_rank is NaN for multi-piece targets, which have no vocabulary rank
+RESULT_COLUMNS = [
+    'model', 'stimulus_id', 'stimulus', 'top_prediction', 'top_prob', 'top_class',
+    'target', 'target_pieces', 'target_prob', 'target_surprise', 'target_rank'
+] + [f'{name}_mass' for name in TOKEN_CLASSES]
+
+# Candidate-only scoring has no top prediction or rank; target_logit is only
+# filled in (and target_prob / target_surprise left NaN) when unnormalized
+CANDIDATE_COLUMNS = [
+    'model', 'stimulus_id', 'stimulus', 'target', 'target_pieces',
+    'target_logit', 'target_prob', 'target_surprise'
+]
+
+
+def tokenize_masked(tokenizer, stimuli: Sequence[str]) -> Tuple[List[List[int]], List[int]]:
+    """
+    Tokenize [MASK] stimuli with the model's own mask token
+    Returns unpadded input ids and the (first) mask position of every stimulus
+    """
+    texts = [s.replace(MASK_PLACEHOLDER, tokenizer.mask_token) for s in stimuli]
+    sequences = tokenizer(texts)['input_ids']
+
+    positions = []
+    for stimulus, ids in zip(stimuli, sequences):
+        if tokenizer.mask_token_id not in ids:
+            raise ValueError(f"No {MASK_PLACEHOLDER} in stimulus: {stimulus}")
+        positions.append(ids.index(tokenizer.mask_token_id))
+    return sequences, positions
+
+
+def pad_sequences(sequences: Sequence[Sequence[int]], pad_id: int) -> Dict:
+    """Right-pad id lists into input_ids / attention_mask tensors"""
+    length = max(len(ids) for ids in sequences)
+    input_ids = torch.full((len(sequences), length), pad_id, dtype=torch.long)
+    attention_mask = torch.zeros((len(sequences), length), dtype=torch.long)
+    for row, ids in enumerate(sequences):
+        input_ids[row, :len(ids)] = torch.tensor(ids, dtype=torch.long)
+        attention_mask[row, :len(ids)] = 1
+    return {'input_ids': input_ids, 'attention_mask': attention_mask}
+
+
+def gather_log_probs(logits: torch.Tensor, target_ids) -> torch.Tensor:
+    """
+    Exact log probs of any number of targets per row: gathered logits minus logsumexp
+    No probability vector is built, so rare targets keep their precision and
+    surprisal (the negation) has no epsilon floor
+    logits: (..., vocab); target_ids: (..., k) with matching leading dims
+    """
+    target_ids = torch.as_tensor(target_ids, device=logits.device)
+    return logits.gather(-1, target_ids) - torch.logsumexp(logits, dim=-1, keepdim=True)
+
+
+def length_batches(lengths: Sequence[int], batch_size: int = 32,
+                   max_tokens: Optional[int] = MAX_BATCH_TOKENS) -> List[List[int]]:
+    """
+    Group item indices into batches of similar tokenized length
+    Items are sorted by length and a batch closes once the next item would take
+    it past batch_size rows or max_tokens padded tokens (an item longer than the
+    budget still gets a batch of its own); callers place results back by index
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches = []
+    current = []
+    for i in order:
+        # Sorted ascending, so item i sets the padded width of the batch
+        full = len(current) >= batch_size
+        over_budget = max_tokens is not None and (len(current) + 1) * lengths[i] > max_tokens
+        if current and (full or over_budget):
+            batches.append(current)
+            current = []
+        current.append(i)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def target_ranks(logits: torch.Tensor, target_ids) -> torch.Tensor:
+    """
+    0-based rank of each target in the vocabulary, computed without sorting
+    The rank is the number of tokens whose logit beats the target's logit,
+    so softmax is never needed (it preserves the ordering)
+    logits: (..., vocab); target_ids: (..., k) with matching leading dims
+    """
+    target_ids = torch.as_tensor(target_ids, device=logits.device)
+    target_logits = logits.gather(-1, target_ids)
+    return (logits.unsqueeze(-2) > target_logits.unsqueeze(-1)).sum(dim=-1)
+
+
+def forward_entries(load_model: Callable, sequences: Sequence[Sequence[int]], positions: Sequence[int],
+                    target_ids: Sequence[Sequence[int]], pad_id: int, batch_size: int = 32,
+                    max_tokens: Optional[int] = MAX_BATCH_TOKENS,
+                    classes: Optional[TokenClassMasks] = None) -> Iterator[Tuple[List[int], List[Dict]]]:
+    """
+    Run the model over every item, one length-bucketed batch at a time
+    Items sharing the same input ids share one row of the forward pass
+    Yields (item indices, entries) per batch
+    """
+    for batch in length_batches([len(ids) for ids in sequences], batch_size, max_tokens):
+        # One forward row per distinct input
+        unique_rows = {}
+        for item in batch:
+            unique_rows.setdefault(tuple(sequences[item]), len(unique_rows))
+        inputs = pad_sequences([list(ids) for ids in unique_rows], pad_id)
+        with torch.no_grad():
+            all_logits = load_model()(**inputs).logits
+
+        rows = torch.tensor([unique_rows[tuple(sequences[item])] for item in batch])
+        logits = all_logits[rows, torch.tensor([positions[item] for item in batch])]
+        top_logits, top_ids = logits.topk(TOP_K, dim=-1)
+        top_log_probs = top_logits - torch.logsumexp(logits, dim=-1, keepdim=True)
+
+        # Every target of the batch in one gather, rows padded to the longest target list
+        width = max(len(target_ids[item]) for item in batch) or 1
+        wanted_ids = torch.tensor([list(target_ids[item]) + [0] * (width - len(target_ids[item]))
+                                   for item in batch], dtype=torch.long)
+        target_log_probs = gather_log_probs(logits, wanted_ids).tolist()
+        ranks = target_ranks(logits, wanted_ids).tolist()
+        class_mass = classes.class_mass(logits).tolist() if classes is not None else None
+
+        entries = []
+        for row, item in enumerate(batch):
+            wanted = list(target_ids[item])
+            entry = {
+                'targets': dict(zip(wanted, zip(target_log_probs[row][:len(wanted)], ranks[row][:len(wanted)]))),
+                'top_k': list(zip(top_ids[row].tolist(), top_log_probs[row].tolist()))
+            }
+            if class_mass is not None:
+                entry['class_mass'] = dict(zip(TOKEN_CLASSES, class_mass[row]))
+            entries.append(entry)
+        yield batch, entries
+
+
+def score_encoded(load_model, sequences: Sequence[Sequence[int]], positions: Sequence[int],
+                  target_ids: Sequence[Sequence[int]], pad_id: int, batch_size: int = 32,
+                  cache: Optional[MLMOutputCache] = None,
+                  fingerprint: Optional[str] = None,
+                  max_tokens: Optional[int] = MAX_BATCH_TOKENS,
+                  classes: Optional[TokenClassMasks] = None,
+                  forward: Optional[Callable] = None) -> List[Dict]:
+    """
+    Log prob and rank of each requested target id at positions[i] of sequences[i]
+    Cached items are answered without the model (load_model is only called on a
+    miss), items sharing the same input ids share one row of the forward pass,
+    and batches are bucketed by length under a max_tokens padding budget
+    forward replaces forward_entries for the misses (e.g. a worker pool's)
+    Returns one entry per item: {'targets': {id: (log_prob, rank)}, 'top_k': [(id, log_prob), ...]}
+    plus 'class_mass': {class: probability} when token-class masks are given
+    """
+    if cache is not None and fingerprint is None:
+        raise ValueError("A cache needs the model fingerprint")
+
+    results = [None] * len(sequences)
+    todo = list(range(len(sequences)))
+
+    if cache is not None:
+        keys = [cache.entry_key(fingerprint, ids, position) for ids, position in zip(sequences, positions)]
+        cached = cache.get_many(keys)
+        todo = []
+        for item, key in enumerate(keys):
+            entry = cached.get(key)
+            if (entry is not None and all(t in entry['targets'] for t in target_ids[item])
+                    and (classes is None or 'class_mass' in entry)):
+                results[item] = entry
+            else:
+                todo.append(item)
+        cache.hits += len(sequences) - len(todo)
+        cache.misses += len(todo)
+
+    if not todo:
+        return results
+
+    batches = (forward or partial(forward_entries, load_model))(
+        [sequences[item] for item in todo], [positions[item] for item in todo],
+        [target_ids[item] for item in todo], pad_id,
+        batch_size=batch_size, max_tokens=max_tokens, classes=classes
+    )
+    for batch, entries in batches:
+        new_entries = {}
+        for index, entry in zip(batch, entries):
+            item = todo[index]
+            results[item] = entry
+            if cache is not None:
+                # Items can repeat within a call; keep every target they asked for
+                if keys[item] in new_entries:
+                    entry = {**entry, 'targets': {**new_entries[keys[item]]['targets'], **entry['targets']}}
+                new_entries[keys[item]] = entry
+
+        # Written per batch, so an interrupted sweep keeps what it already scored
+        if new_entries:
+            cache.put_many(fingerprint, new_entries)
+
+    return results
+
+
+def score_masked(tokenizer, load_model: Callable, stimuli: Sequence[str],
+                 target_ids: Sequence[Sequence[int]], batch_size: int = 32,
+                 cache: Optional[MLMOutputCache] = None,
+                 fingerprint: Optional[str] = None,
+                 max_tokens: Optional[int] = MAX_BATCH_TOKENS) -> List[Dict]:
+    """score_encoded for [MASK] stimuli, scoring each at its mask position"""
+    sequences, positions = tokenize_masked(tokenizer, stimuli)
+    return score_encoded(load_model, sequences, positions, target_ids, tokenizer.pad_token_id,
+                         batch_size=batch_size, cache=cache, fingerprint=fingerprint,
+                         max_tokens=max_tokens)
+
+
+def span_items(sequence: Sequence[int], position: int, pieces: Sequence[int],
+               mask_id: int, mode: str = 'pll') -> List[Tuple[List[int], int, int]]:
+    """
+    (input ids, scored position, expected piece) for every pass a target needs
+    The single mask at position is widened to one slot per sub-token piece:
+      pll   - each piece masked alone, the others visible (pseudo-log-likelihood)
+      chain - left-to-right chain rule, pieces after the scored one stay masked
+      joint - every piece masked at once; one pass scores them all
+    Single-piece targets give the original sequence under every mode
+    """
+    if mode not in SPAN_MODES:
+        raise ValueError(f"Unknown span mode '{mode}', expected one of {SPAN_MODES}")
+
+    prefix, suffix = list(sequence[:position]), list(sequence[position + 1:])
+    k = len(pieces)
+    items = []
+    for i in range(k):
+        if mode == 'pll':
+            span = list(pieces[:i]) + [mask_id] + list(pieces[i + 1:])
+        elif mode == 'chain':
+            span = list(pieces[:i]) + [mask_id] * (k - i)
+        else:
+            span = [mask_id] * k
+        items.append((prefix + span + suffix, position + i, pieces[i]))
+    return items
+
+
+def score_spans(tokenizer, load_model: Callable, stimuli: Sequence[str],
+                targets: Sequence[Sequence[str]], mode: str = 'pll', batch_size: int = 32,
+                cache: Optional[MLMOutputCache] = None,
+                fingerprint: Optional[str] = None,
+                max_tokens: Optional[int] = MAX_BATCH_TOKENS,
+                classes: Optional[TokenClassMasks] = None,
+                forward: Optional[Callable] = None) -> List[Dict]:
+    """
+    Score whole target words at the mask of each stimulus, however many pieces they have
+    The passes for every piece of every target are batched (and de-duplicated) together
+    Returns per stimulus {'top_k': [...], 'targets': {word: {'log_prob', 'rank', 'pieces'}}}
+    where log_prob sums the pieces; rank is the vocabulary rank of a single-piece target
+    and None for a multi-piece one, since a piece's rank inside the widened span is
+    not a rank of the word; with token-class masks each stimulus also gets 'class_mass'
+    at its mask
+    """
+    sequences, positions = tokenize_masked(tokenizer, stimuli)
+    return score_spans_encoded(tokenizer, load_model, sequences, positions, targets, mode=mode,
+                               batch_size=batch_size, cache=cache, fingerprint=fingerprint,
+                               max_tokens=max_tokens, classes=classes, forward=forward)
+
+
+def score_spans_encoded(tokenizer, load_model: Callable, sequences: Sequence[Sequence[int]],
+                        positions: Sequence[int], targets: Sequence[Sequence[str]],
+                        mode: str = 'pll', batch_size: int = 32,
+                        cache: Optional[MLMOutputCache] = None,
+                        fingerprint: Optional[str] = None,
+                        max_tokens: Optional[int] = MAX_BATCH_TOKENS,
+                        classes: Optional[TokenClassMasks] = None,
+                        forward: Optional[Callable] = None) -> List[Dict]:
+    """score_spans for inputs already encoded, with the mask at positions[i]"""
+    keys, item_targets, plans = _plan_spans(tokenizer, sequences, positions, targets, mode)
+    entries = score_encoded(
+        load_model, [list(ids) for ids, _ in keys], [position for _, position in keys],
+        item_targets, tokenizer.pad_token_id,
+        batch_size=batch_size, cache=cache, fingerprint=fingerprint, max_tokens=max_tokens,
+        classes=classes, forward=forward
+    )
+    by_key = dict(zip(keys, entries))
+
+    results = []
+    for base, word_plans in plans:
+        scored = {}
+        for word, (pieces, piece_keys) in word_plans.items():
+            piece_scores = [by_key[key]['targets'][piece] for key, piece in zip(piece_keys, pieces)]
+            scored[word] = {
+                'log_prob': float(sum(log_prob for log_prob, _ in piece_scores)),
+                'rank': piece_scores[0][1] if len(pieces) == 1 else None,
+                'pieces': len(pieces)
+            }
+        result = {'top_k': by_key[base]['top_k'], 'targets': scored}
+        if classes is not None:
+            result['class_mass'] = by_key[base]['class_mass']
+        results.append(result)
+    return results
+
+
+def masked_lm_head(model) -> Optional[Tuple[torch.nn.Module, Callable, torch.Tensor, Optional[torch.Tensor]]]:
+    """
+    Split a masked LM into (encoder, head transform, decoder weight, decoder bias)
+    so the vocabulary projection can be applied to chosen rows and tokens only
+    Returns None for models without a known plain-Linear head (int8, ONNX)
+    """
+    decoder = model.get_output_embeddings() if hasattr(model, 'get_output_embeddings') else None
+    if type(decoder) is not torch.nn.Linear:
+        return None
+
+    model_type = model.config.model_type
+    if model_type == 'bert':
+        transform = model.cls.predictions.transform
+    elif model_type == 'roberta':
+        head = model.lm_head
+        transform = lambda hidden: head.layer_norm(gelu(head.dense(hidden)))
+    elif model_type == 'albert':
+        head = model.predictions
+        transform = lambda hidden: head.LayerNorm(head.activation(head.dense(hidden)))
+    elif model_type == 'distilbert':
+        transform = lambda hidden: model.vocab_layer_norm(model.activation(model.vocab_transform(hidden)))
+    else:
+        return None
+    return model.base_model, transform, decoder.weight, decoder.bias
+
+
+def score_candidate_ids(load_model: Callable, sequences: Sequence[Sequence[int]],
+                        positions: Sequence[int], candidate_ids: Sequence[Sequence[int]],
+                        pad_id: int, normalize: bool = True, batch_size: int = 32,
+                        max_tokens: Optional[int] = MAX_BATCH_TOKENS,
+                        cache: Optional[MLMOutputCache] = None,
+                        fingerprint: Optional[str] = None) -> List[Dict[int, float]]:
+    """
+    Scores of a few candidate ids at positions[i] of sequences[i]
+    Only the masked rows go through the LM head, and only the candidates' rows
+    of the output embedding are gathered. normalize=True adds the exact
+    log-normalizer (one full-vocabulary projection per masked row) to give log
+    probs; normalize=False returns raw logits, whose differences are log-odds
+    Falls back to the full forward pass for models masked_lm_head can't split
+    Cached items are answered without the model (load_model is only called on a miss)
+    """
+    if cache is not None and fingerprint is None:
+        raise ValueError("A cache needs the model fingerprint")
+
+    results = [None] * len(sequences)
+    todo = list(range(len(sequences)))
+
+    if cache is not None:
+        keys = [cache.candidate_key(fingerprint, ids, position, normalize)
+                for ids, position in zip(sequences, positions)]
+        cached = cache.get_candidates(keys)
+        todo = []
+        for item, key in enumerate(keys):
+            scores = cached.get(key)
+            if scores is not None and all(t in scores for t in candidate_ids[item]):
+                results[item] = {t: scores[t] for t in candidate_ids[item]}
+            else:
+                todo.append(item)
+        cache.hits += len(sequences) - len(todo)
+        cache.misses += len(todo)
+
+    if not todo:
+        return results
+
+    model = load_model()
+    head = masked_lm_head(model)
+
+    for batch in length_batches([len(sequences[item]) for item in todo], batch_size, max_tokens):
+        batch = [todo[index] for index in batch]
+        inputs = pad_sequences([sequences[item] for item in batch], pad_id)
+        rows = torch.arange(len(batch))
+        cols = torch.tensor([positions[item] for item in batch])
+
+        # Every candidate of the batch, projected in one small matmul
+        union = sorted({t for item in batch for t in candidate_ids[item]})
+        column = {t: i for i, t in enumerate(union)}
+        union_ids = torch.tensor(union, dtype=torch.long)
+
+        with torch.no_grad():
+            if head is None:
+                logits = model(**inputs).logits[rows, cols]
+                expanded = union_ids.expand(len(batch), -1)
+                scores = gather_log_probs(logits, expanded) if normalize else logits.gather(-1, expanded)
+                log_z = None
+            else:
+                encoder, transform, weight, bias = head
+                hidden = transform(encoder(**inputs)[0][rows, cols])
+                scores = torch.nn.functional.linear(
+                    hidden, weight[union_ids], None if bias is None else bias[union_ids]
+                )
+                log_z = torch.logsumexp(torch.nn.functional.linear(hidden, weight, bias), dim=-1) \
+                    if normalize else None
+            if log_z is not None:
+                scores = scores - log_z.unsqueeze(-1)
+
+        new_entries = {}
+        for row, item in enumerate(batch):
+            results[item] = {t: float(scores[row, column[t]]) for t in candidate_ids[item]}
+            if cache is not None:
+                new_entries[keys[item]] = {**new_entries.get(keys[item], {}), **results[item]}
+
+        # Written per batch, so an interrupted sweep keeps what it already scored
+        if new_entries:
+            cache.put_candidates(fingerprint, new_entries)
+    return results
+
+
+def score_candidates(tokenizer, load_model: Callable, stimuli: Sequence[str],
+                     candidates: Sequence[Sequence[str]], normalize: bool = True,
+                     mode: str = 'pll', batch_size: int = 32,
+                     max_tokens: Optional[int] = MAX_BATCH_TOKENS,
+                     cache: Optional[MLMOutputCache] = None,
+                     fingerprint: Optional[str] = None) -> List[Dict[str, Dict]]:
+    """
+    Score only the candidate words at the mask of each stimulus (e.g. "down" vs "up")
+    Returns per stimulus {word: {'log_prob', 'pieces'}}; with normalize=False
+    log_prob is the unnormalized logit, comparable only between candidates of
+    the same stimulus, so every candidate must then be a single token
+    With a cache, candidate scores are stored per input and candidate id, so
+    reruns never load the model
+    """
+    sequences, positions = tokenize_masked(tokenizer, stimuli)
+    return score_candidates_encoded(tokenizer, load_model, sequences, positions, candidates,
+                                    normalize=normalize, mode=mode, batch_size=batch_size,
+                                    max_tokens=max_tokens, cache=cache, fingerprint=fingerprint)
+
+
+def score_candidates_encoded(tokenizer, load_model: Callable, sequences: Sequence[Sequence[int]],
+                             positions: Sequence[int], candidates: Sequence[Sequence[str]],
+                             normalize: bool = True, mode: str = 'pll', batch_size: int = 32,
+                             max_tokens: Optional[int] = MAX_BATCH_TOKENS,
+                             cache: Optional[MLMOutputCache] = None,
+                             fingerprint: Optional[str] = None) -> List[Dict[str, Dict]]:
+    """score_candidates for inputs already encoded, with the mask at positions[i]"""
+    keys, item_targets, plans = _plan_spans(tokenizer, sequences, positions, candidates, mode)
+    if not normalize:
+        for _, word_plans in plans:
+            for word, (pieces, _) in word_plans.items():
+                if len(pieces) > 1:
+                    raise ValueError(f"Unnormalized scores need single-token candidates, "
+                                     f"'{word}' has {len(pieces)} pieces")
+
+    # The bare mask only matters for top-k, which candidate scoring never reports
+    wanted = [item for item, pieces in enumerate(item_targets) if pieces]
+    entries = score_candidate_ids(
+        load_model, [list(keys[item][0]) for item in wanted], [keys[item][1] for item in wanted],
+        [item_targets[item] for item in wanted], tokenizer.pad_token_id,
+        normalize=normalize, batch_size=batch_size, max_tokens=max_tokens,
+        cache=cache, fingerprint=fingerprint
+    )
+    by_key = dict(zip([keys[item] for item in wanted], entries))
+
+    results = []
+    for _, word_plans in plans:
+        results.append({
+            word: {
+                'log_prob': float(sum(by_key[key][piece] for key, piece in zip(piece_keys, pieces))),
+                'pieces': len(pieces)
+            }
+            for word, (pieces, piece_keys) in word_plans.items()
+        })
+    return results
+
+
+class MaskedLMScorer:
+    """Score [MASK] stimuli across several checkpoints, reusing each loaded model"""
+
+    def __init__(self, model_names: Sequence[str] = LOCAL_MODELS, batch_size: int = 32,
+                 use_cache: bool = True, keep_models: bool = True, span_mode: str = 'pll',
+                 variant: Optional[str] = None, max_tokens: Optional[int] = MAX_BATCH_TOKENS,
+                 workers: int = 0):
+        self.model_names = list(model_names)
+        # Batches hold at most batch_size stimuli and max_tokens padded tokens
+        self.batch_size = batch_size
+        self.max_tokens = max_tokens
+        self.span_mode = span_mode
+        # 'fp32', 'int8' or 'onnx' - see model_registry.VARIANTS
+        self.variant = variant or model_registry.DEFAULT_VARIANT
+
+        # workers > 0 loads every model now and forks workers that share the
+        # weights; uncached batches are then spread across them. Forking comes
+        # before the cache is opened, so children don't inherit its connection
+        self.pool = None
+        if workers:
+            from worker_pool import ForkedScoringPool
+            self.pool = ForkedScoringPool(self.model_names, workers, self.variant)
+
+        self.cache = default_cache() if use_cache else None
+        # With keep_models=False each checkpoint is evicted once scored, so a
+        # sweep only ever holds one set of weights
+        self.keep_models = keep_models
+        self._fingerprints = {}
+
+    def _forward(self, model_name: str) -> Optional[Callable]:
+        return self.pool.forward(model_name) if self.pool is not None else None
+
+    def close(self):
+        """Shut down the worker pool, if any; the scorer keeps working in-process"""
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def tokenizer(self, model_name: str):
+        return model_registry.get_tokenizer(model_name)
+
+    def load(self, model_name: str):
+        """Tokenizer and model for model_name from the shared registry"""
+        return model_registry.get_model(model_name, self.variant)
+
+    def fingerprint(self, model_name: str) -> str:
+        if model_name not in self._fingerprints:
+            self._fingerprints[model_name] = model_fingerprint(
+                model_name, self.tokenizer(model_name), variant=self.variant
+            )
+        return self._fingerprints[model_name]
+
+    def score_entries(self, model_name: str, stimuli: Sequence[str],
+                      target_ids: Sequence[Sequence[int]]) -> List[Dict]:
+        """score_masked with this scorer's model, batch size and cache"""
+        sequences, positions = tokenize_masked(self.tokenizer(model_name), stimuli)
+        return self.score_encoded_entries(model_name, sequences, positions, target_ids)
+
+    def score_encoded_entries(self, model_name: str, sequences: Sequence[Sequence[int]],
+                              positions: Sequence[int],
+                              target_ids: Sequence[Sequence[int]]) -> List[Dict]:
+        """score_encoded with this scorer's model, batch size and cache (e.g. for spliced templates)"""
+        return score_encoded(
+            lambda: self.load(model_name)[1], sequences, positions, target_ids,
+            self.tokenizer(model_name).pad_token_id,
+            batch_size=self.batch_size,
+            max_tokens=self.max_tokens,
+            cache=self.cache,
+            fingerprint=self.fingerprint(model_name) if self.cache is not None else None,
+            forward=self._forward(model_name)
+        )
+
+    def score_model(self, model_name: str, stimuli: Sequence[str],
+                    targets: Optional[Sequence[Sequence[str]]] = None) -> List[Dict]:
+        """
+        Score every stimulus with one model
+        targets[i] lists the words whose probability and rank are wanted for stimulus i
+        """
+        tokenizer = self.tokenizer(model_name)
+        classes = token_classes(tokenizer)
+        targets = _normalize_targets(targets, len(stimuli))
+        entries = score_spans(
+            tokenizer, lambda: self.load(model_name)[1], stimuli, targets,
+            mode=self.span_mode,
+            batch_size=self.batch_size,
+            max_tokens=self.max_tokens,
+            cache=self.cache,
+            fingerprint=self.fingerprint(model_name) if self.cache is not None else None,
+            classes=classes,
+            forward=self._forward(model_name)
+        )
+
+        rows = []
+        for stimulus_id, (stimulus, entry) in enumerate(zip(stimuli, entries)):
+            top_id, top_log_prob = entry['top_k'][0]
+            row = {
+                'model': model_name,
+                'stimulus_id': stimulus_id,
+                'stimulus': stimulus,
+                'top_prediction': tokenizer.decode([top_id]).strip(),
+                'top_prob': float(np.exp(top_log_prob)),
+                'top_class': classes.token_class(top_id),
+                **{f'{name}_mass': mass for name, mass in entry['class_mass'].items()}
+            }
+            if not targets[stimulus_id]:
+                rows.append(row)
+                continue
+
+            for target in targets[stimulus_id]:
+                scored = entry['targets'][target]
+                rows.append({
+                    **row,
+                    'target': target,
+                    'target_pieces': scored['pieces'],
+                    'target_prob': float(np.exp(scored['log_prob'])),
+                    'target_surprise': -scored['log_prob'],
+                    'target_rank': np.nan if scored['rank'] is None else scored['rank']
+                })
+
+        return rows
+
+    def score_candidates(self, stimuli: Sequence[str], candidates: Sequence[Sequence[str]],
+                         normalize: bool = True) -> pd.DataFrame:
+        """
+        Candidate-only scoring with every model, for experiments that just compare
+        a few words per stimulus; one row per (model, stimulus, candidate)
+        """
+        stimuli = list(stimuli)
+        candidates = _normalize_targets(candidates, len(stimuli))
+        rows = []
+        for model_name in self.model_names:
+            print(f"Scoring {len(stimuli)} stimuli with {model_name}...")
+            was_loaded = model_registry.is_loaded(model_name, self.variant)
+            try:
+                entries = score_candidates(
+                    self.tokenizer(model_name), lambda: self.load(model_name)[1], stimuli, candidates,
+                    normalize=normalize, mode=self.span_mode,
+                    batch_size=self.batch_size, max_tokens=self.max_tokens,
+                    cache=self.cache,
+                    fingerprint=self.fingerprint(model_name) if self.cache is not None else None
+                )
+                for stimulus_id, (stimulus, entry) in enumerate(zip(stimuli, entries)):
+                    for target in candidates[stimulus_id]:
+                        scored = entry[target]
+                        rows.append({
+                            'model': model_name,
+                            'stimulus_id': stimulus_id,
+                            'stimulus': stimulus,
+                            'target': target,
+                            'target_pieces': scored['pieces'],
+                            'target_logit': np.nan if normalize else scored['log_prob'],
+                            'target_prob': float(np.exp(scored['log_prob'])) if normalize else np.nan,
+                            'target_surprise': -scored['log_prob'] if normalize else np.nan
+                        })
+            except Exception as e:
+                print(f"  Error with {model_name}: {e}")
+            if not self.keep_models and not was_loaded:
+                model_registry.evict(model_name, self.variant)
+        return pd.DataFrame(rows, columns=CANDIDATE_COLUMNS)
+
+    def score(self, stimuli: Sequence[str],
+              targets: Optional[Sequence[Sequence[str]]] = None) -> pd.DataFrame:
+        """
+        Score every stimulus with every model
+        Returns one row per (model, stimulus, target); models that fail to load are skipped
+        """
+        stimuli = list(stimuli)
+        rows = []
+        for model_name in self.model_names:
+            print(f"Scoring {len(stimuli)} stimuli with {model_name}...")
+            was_loaded = model_registry.is_loaded(model_name, self.variant)
+            try:
+                rows.extend(self.score_model(model_name, stimuli, targets))
+            except Exception as e:
+                print(f"  Error with {model_name}: {e}")
+            if not self.keep_models and not was_loaded:
+                model_registry.evict(model_name, self.variant)
+        return pd.DataFrame(rows, columns=RESULT_COLUMNS)
+
+
+def _plan_spans(tokenizer, sequences: Sequence[Sequence[int]], positions: Sequence[int],
+                targets: Sequence[Sequence[str]],
+                mode: str) -> Tuple[List[Tuple[Tuple[int, ...], int]], List[List[int]], List[Tuple]]:
+    """
+    Every distinct (input ids, position) that scoring targets at the masks needs
+    Returns the item keys, the piece ids wanted at each item, and per input
+    (base key, {word: (pieces, item key per piece)})
+    """
+    # Gather every (input, position) to score, merging the pieces asked of it
+    item_index = {}
+    item_targets = []
+
+    def add_item(ids, position, piece=None):
+        key = (tuple(ids), position)
+        if key not in item_index:
+            item_index[key] = len(item_targets)
+            item_targets.append([])
+        if piece is not None and piece not in item_targets[item_index[key]]:
+            item_targets[item_index[key]].append(piece)
+        return key
+
+    # Targets as they appear in context (e.g. RoBERTa's leading-space pieces)
+    target_resolver = resolver(tokenizer)
+    plans = []
+    for ids, position, words in zip(sequences, positions, targets):
+        base = add_item(ids, position)
+        word_plans = {}
+        for word in words:
+            pieces = target_resolver.at(word, position)
+            word_plans[word] = (pieces, [add_item(item_ids, item_position, piece)
+                                         for item_ids, item_position, piece
+                                         in span_items(ids, position, pieces, tokenizer.mask_token_id, mode)])
+        plans.append((base, word_plans))
+
+    return list(item_index), item_targets, plans
+
+
+def _normalize_targets(targets, n_stimuli: int) -> List[List[str]]:
+    """Accept None, one word per stimulus, or a list of words per stimulus"""
+    if targets is None:
+        return [[] for _ in range(n_stimuli)]
+    if len(targets) != n_stimuli:
+        raise ValueError(f"Got {n_stimuli} stimuli but {len(targets)} target lists")
+    return [[t] if isinstance(t, str) else list(t) for t in targets]
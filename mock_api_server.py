@@ -0,0 +1,569 @@
+"""
+Local stand-in for the OpenAI and Anthropic chat APIs
+Speaks the chat-completions (POST /v1/chat/completions), messages
+(POST /v1/messages) and echoed-logprob completions (POST /v1/completions)
+wire formats with configurable latency, rate limits and injected failures;
+replies are deterministic or come from a local masked or causal LM,
+so the API harnesses can be load-tested offline; the
+providers' batch endpoints (OpenAI files + /v1/batches, Anthropic
+/v1/messages/batches) are emulated too, finishing after MOCK_API_BATCH_SECONDS
+
+Start it:        python mock_api_server.py
+Point the SDKs:  OPENAI_BASE_URL=http://127.0.0.1:8766/v1  ANTHROPIC_BASE_URL=http://127.0.0.1:8766
+                 (any non-empty OPENAI_API_KEY / ANTHROPIC_API_KEY)
+Benchmark:       MOCK_API_BENCHMARK=200 python mock_api_server.py
+
+Configuration (environment):
+    MOCK_API_LATENCY       fixed:MS | uniform:LO:HI | exp:MEAN | lognormal:MEDIAN:SIGMA  (ms)
+    MOCK_API_RPS           requests per second per provider before 429s (0 = unlimited)
+    MOCK_API_FAILURE_RATE  fraction of requests answered with a 5xx
+    MOCK_API_RESPONDER     'deterministic', a masked-LM name such as bert-base-uncased,
+                           or causal:NAME for a causal LM such as causal:gpt2
+    MOCK_API_SEED          seed for latency and failure draws
+    MOCK_API_BATCH_SECONDS how long a batch job stays in progress
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from email import message_from_bytes
+from email.policy import HTTP
+from urllib.parse import urlparse
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional, Tuple
+
+MOCK_API_URL = os.getenv('MOCK_API_URL', 'http://127.0.0.1:8766')
+
+LATENCY = os.getenv('MOCK_API_LATENCY', 'lognormal:200:0.5')
+RATE_LIMIT = float(os.getenv('MOCK_API_RPS', '0'))
+FAILURE_RATE = float(os.getenv('MOCK_API_FAILURE_RATE', '0'))
+RESPONDER = os.getenv('MOCK_API_RESPONDER', 'deterministic')
+SEED = int(os.getenv('MOCK_API_SEED', '0'))
+BATCH_SECONDS = float(os.getenv('MOCK_API_BATCH_SECONDS', '2'))
+
+# MOCK_API_RESPONDER prefix selecting a causal LM, and its longest reply
+CAUSAL_PREFIX = 'causal:'
+CAUSAL_MAX_TOKENS = 16
+
+ROUTES = {
+    '/v1/chat/completions': 'openai',
+    '/v1/completions': 'openai',
+    '/v1/messages': 'anthropic',
+}
+
+BATCH_ROUTES = {
+    '/v1/batches': 'openai',
+    '/v1/messages/batches': 'anthropic',
+}
+
+# Status and error type of an injected failure, per provider
+FAILURES = {
+    'openai': (500, 'server_error'),
+    'anthropic': (529, 'overloaded_error'),
+}
+
+# Vocabulary of the deterministic responder
+REPLY_WORDS = [
+    'today', 'ice', 'winter', 'wet', 'future', 'down', 'success', 'slippery',
+    'ground', 'there', 'falls', 'yes', 'no', 'before', 'after', 'water'
+]
+
+
+def latency_sampler(spec: str, rng: random.Random) -> Callable[[], float]:
+    """Seconds-returning sampler for a MOCK_API_LATENCY spec (values in ms)"""
+    kind, *args = spec.split(':')
+    args = [float(a) for a in args]
+    if kind == 'fixed':
+        return lambda: args[0] / 1000
+    if kind == 'uniform':
+        return lambda: rng.uniform(args[0], args[1]) / 1000
+    if kind == 'exp':
+        return lambda: rng.expovariate(1 / args[0]) / 1000
+    if kind == 'lognormal':
+        return lambda: rng.lognormvariate(math.log(args[0]), args[1]) / 1000
+    raise ValueError(f"Unknown latency distribution '{kind}', expected fixed, uniform, exp or lognormal")
+
+
+class TokenBucket:
+    """requests-per-second limiter with a burst of one second's worth"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self) -> Optional[float]:
+        """None if the request may proceed, else seconds until it could"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return None
+            return (1 - self.tokens) / self.rate
+
+
+def _prompt_text(messages) -> str:
+    """Text of the last user message (string content or text blocks)"""
+    for message in reversed(messages):
+        if message.get('role') == 'user':
+            content = message.get('content', '')
+            if isinstance(content, list):
+                return ' '.join(block.get('text', '') for block in content if block.get('type') == 'text')
+            return content
+    return ''
+
+
+def deterministic_reply(model: str, messages, max_tokens: Optional[int]) -> str:
+    """The same words for the same model and messages, on every run"""
+    digest = hashlib.sha256(json.dumps([model, messages], sort_keys=True).encode()).digest()
+    words = [REPLY_WORDS[b % len(REPLY_WORDS)] for b in digest[:1 + digest[-1] % 3]]
+    return ' '.join(words[:max_tokens or len(words)])
+
+
+class MaskedLMResponder:
+    """
+    Answers with a local masked LM's top prediction
+    '___' in the prompt becomes the mask, otherwise a mask is appended; runs
+    through an in-process ScoringServer so concurrent requests share batches
+    """
+
+    def __init__(self, model_name: str):
+        from scoring_server import ScoringServer
+
+        self.model_name = model_name
+        self.server = ScoringServer([model_name])
+        self.server.warm()
+
+    def __call__(self, model: str, messages, max_tokens: Optional[int]) -> str:
+        from mlm_scoring import MASK_PLACEHOLDER
+
+        text = _prompt_text(messages).split(':', 1)[-1].strip()
+        stimulus = text.replace('___', MASK_PLACEHOLDER) if '___' in text else f"{text} {MASK_PLACEHOLDER}"
+        entry = self.server.handle({'model': self.model_name, 'stimuli': [stimulus]})['entries'][0]
+        words = [token for _, _, token in entry['top_k'] if token.isalpha()]
+        return words[0] if words else entry['top_k'][0][2]
+
+
+class CausalLMResponder:
+    """
+    Answers with a local causal LM's greedy continuation of the prompt
+    Text from '___' on is dropped, so fill-in prompts are continued at the
+    blank; replies stop at max_tokens (at most CAUSAL_MAX_TOKENS) or a newline
+    """
+
+    def __init__(self, model_name: str):
+        from causal_scoring import CausalLMScorer
+
+        self.model_name = model_name
+        self.scorer = CausalLMScorer(model_name)
+        self.scorer.load()
+        # One generation at a time: the handler threads share the weights
+        self._lock = threading.Lock()
+
+    def __call__(self, model: str, messages, max_tokens: Optional[int]) -> str:
+        import torch
+
+        text = _prompt_text(messages).split(':', 1)[-1].split('___', 1)[0].strip()
+        tokenizer, lm = self.scorer.load()
+        prompt_ids = tokenizer.encode(text, add_special_tokens=False) or [tokenizer.eos_token_id]
+        with self._lock, torch.no_grad():
+            output = lm.generate(
+                torch.tensor([prompt_ids]),
+                max_new_tokens=min(max_tokens or CAUSAL_MAX_TOKENS, CAUSAL_MAX_TOKENS),
+                do_sample=False,
+                pad_token_id=tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+            )
+        reply = tokenizer.decode(output[0, len(prompt_ids):], skip_special_tokens=True)
+        return reply.strip().split('\n', 1)[0]
+
+
+def make_responder(responder: str) -> Callable:
+    """The reply function for a MOCK_API_RESPONDER value"""
+    if responder == 'deterministic':
+        return deterministic_reply
+    if responder.startswith(CAUSAL_PREFIX):
+        return CausalLMResponder(responder[len(CAUSAL_PREFIX):])
+    return MaskedLMResponder(responder)
+
+
+class MockApi:
+    """Latency, rate limiting, failure injection and response bodies for both providers"""
+
+    def __init__(self, latency: str = LATENCY, rate_limit: float = RATE_LIMIT,
+                 failure_rate: float = FAILURE_RATE, responder: str = RESPONDER, seed: int = SEED):
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._latency = latency_sampler(latency, self._rng)
+        self.failure_rate = failure_rate
+        self.buckets = {provider: TokenBucket(rate_limit) for provider in FAILURES} if rate_limit > 0 else {}
+        self.respond = make_responder(responder)
+        self.counts = {'requests': 0, 'rate_limited': 0, 'failed': 0}
+        self._counts_lock = threading.Lock()
+
+    def _count(self, key: str):
+        with self._counts_lock:
+            self.counts[key] += 1
+
+    def handle(self, provider: str, payload: Dict):
+        """(status, headers, body) for one request"""
+        self._count('requests')
+        bucket = self.buckets.get(provider)
+        wait = bucket.take() if bucket is not None else None
+        if wait is not None:
+            self._count('rate_limited')
+            return 429, {'retry-after': f"{wait:.3f}"}, _error(provider, 'rate_limit_error', 'Rate limit exceeded')
+
+        with self._rng_lock:
+            delay = self._latency()
+        time.sleep(delay)
+        status, body = self.answer(provider, payload)
+        return status, {}, body
+
+    def answer(self, provider: str, payload: Dict) -> Tuple[int, Dict]:
+        """(status, body) of one chat request, after failure injection"""
+        with self._rng_lock:
+            failed = self._rng.random() < self.failure_rate
+        if failed:
+            self._count('failed')
+            status, kind = FAILURES[provider]
+            return status, _error(provider, kind, 'Injected failure')
+
+        if 'prompt' in payload and 'model' in payload:
+            return 200, _echo_completion(payload)
+        if 'model' not in payload or 'messages' not in payload:
+            return 400, _error(provider, 'invalid_request_error', 'model and messages are required')
+        if provider == 'anthropic' and 'max_tokens' not in payload:
+            return 400, _error(provider, 'invalid_request_error', 'max_tokens: Field required')
+
+        text = self.respond(payload['model'], payload['messages'], payload.get('max_tokens'))
+        return 200, _completion(provider, payload, text)
+
+
+class MockBatches:
+    """
+    Offline batch jobs of both providers, answered by a MockApi
+    Jobs stay in progress for `seconds`, then every line is answered at once
+    (injected failures become per-line errors, as in the real endpoints)
+    """
+
+    def __init__(self, api: MockApi, url: str = MOCK_API_URL, seconds: float = BATCH_SECONDS):
+        self.api = api
+        self.url = url
+        self.seconds = seconds
+        self.files = {}
+        self.jobs = {}
+        self._lock = threading.Lock()
+
+    def _later(self, job_id: str, finish: Callable[[str], None]):
+        timer = threading.Timer(self.seconds, finish, args=(job_id,))
+        timer.daemon = True
+        timer.start()
+
+    # OpenAI: upload a JSONL file, create a batch from it, download the output file
+
+    def upload(self, filename: str, data: bytes) -> Dict:
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        with self._lock:
+            self.files[file_id] = data
+        return {'id': file_id, 'object': 'file', 'bytes': len(data), 'created_at': int(time.time()),
+                'filename': filename, 'purpose': 'batch', 'status': 'processed'}
+
+    def create_openai(self, body: Dict) -> Tuple[int, Dict]:
+        if body.get('input_file_id') not in self.files:
+            return 404, _error('openai', 'invalid_request_error', f"No such file: {body.get('input_file_id')}")
+        now = int(time.time())
+        job = {
+            'id': f"batch_{uuid.uuid4().hex[:24]}", 'object': 'batch',
+            'endpoint': body.get('endpoint', '/v1/chat/completions'), 'errors': None,
+            'input_file_id': body['input_file_id'],
+            'completion_window': body.get('completion_window', '24h'),
+            'status': 'in_progress', 'output_file_id': None, 'error_file_id': None,
+            'created_at': now, 'in_progress_at': now, 'expires_at': now + 86400,
+            'completed_at': None, 'failed_at': None, 'expired_at': None,
+            'request_counts': {'total': 0, 'completed': 0, 'failed': 0},
+            'metadata': body.get('metadata')
+        }
+        with self._lock:
+            self.jobs[job['id']] = job
+        self._later(job['id'], self._finish_openai)
+        return 200, job
+
+    def _finish_openai(self, job_id: str):
+        job = self.jobs[job_id]
+        output, errors = [], []
+        for line in self.files[job['input_file_id']].decode().splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            status, body = self.api.answer('openai', item['body'])
+            result = {'id': f"batch_req_{uuid.uuid4().hex[:24]}", 'custom_id': item['custom_id'],
+                      'response': {'status_code': status, 'request_id': uuid.uuid4().hex, 'body': body},
+                      'error': None}
+            (output if status == 200 else errors).append(json.dumps(result))
+
+        with self._lock:
+            for key, lines in (('output_file_id', output), ('error_file_id', errors)):
+                if lines:
+                    file_id = f"file-{uuid.uuid4().hex[:24]}"
+                    self.files[file_id] = ('\n'.join(lines) + '\n').encode()
+                    job[key] = file_id
+            job['request_counts'] = {'total': len(output) + len(errors),
+                                     'completed': len(output), 'failed': len(errors)}
+            job['status'] = 'completed'
+            job['completed_at'] = int(time.time())
+
+    # Anthropic: one request carrying every params object, results as JSONL
+
+    def create_anthropic(self, body: Dict) -> Tuple[int, Dict]:
+        requests = body.get('requests')
+        if not requests:
+            return 400, _error('anthropic', 'invalid_request_error', 'requests: Field required')
+        now = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        job = {
+            'id': f"msgbatch_{uuid.uuid4().hex[:24]}", 'type': 'message_batch',
+            'processing_status': 'in_progress',
+            'request_counts': {'processing': len(requests), 'succeeded': 0, 'errored': 0,
+                               'canceled': 0, 'expired': 0},
+            'created_at': now, 'expires_at': now, 'ended_at': None,
+            'cancel_initiated_at': None, 'archived_at': None, 'results_url': None,
+            '_requests': requests, '_results': None
+        }
+        with self._lock:
+            self.jobs[job['id']] = job
+        self._later(job['id'], self._finish_anthropic)
+        return 200, self.public(job)
+
+    def _finish_anthropic(self, job_id: str):
+        job = self.jobs[job_id]
+        results = []
+        succeeded = 0
+        for item in job['_requests']:
+            status, body = self.api.answer('anthropic', item['params'])
+            succeeded += status == 200
+            result = ({'type': 'succeeded', 'message': body} if status == 200
+                      else {'type': 'errored', 'error': body})
+            results.append(json.dumps({'custom_id': item['custom_id'], 'result': result}))
+
+        with self._lock:
+            job['_results'] = ('\n'.join(results) + '\n').encode()
+            job['request_counts'] = {'processing': 0, 'succeeded': succeeded,
+                                     'errored': len(results) - succeeded, 'canceled': 0, 'expired': 0}
+            job['processing_status'] = 'ended'
+            job['ended_at'] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+            job['results_url'] = f"{self.url}/v1/messages/batches/{job_id}/results"
+
+    @staticmethod
+    def public(job: Dict) -> Dict:
+        return {key: value for key, value in job.items() if not key.startswith('_')}
+
+
+def _multipart_file(content_type: str, body: bytes) -> Tuple[str, bytes]:
+    """(filename, bytes) of the file part of a multipart/form-data upload"""
+    message = message_from_bytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body, policy=HTTP)
+    for part in message.iter_parts():
+        if part.get_filename():
+            return part.get_filename(), part.get_payload(decode=True)
+    raise ValueError("No file in upload")
+
+
+def _error(provider: str, kind: str, message: str) -> Dict:
+    if provider == 'anthropic':
+        return {'type': 'error', 'error': {'type': kind, 'message': message}}
+    return {'error': {'message': message, 'type': kind, 'param': None, 'code': None}}
+
+
+def _completion(provider: str, payload: Dict, text: str) -> Dict:
+    request_id = hashlib.sha1(f"{time.time_ns()}{text}".encode()).hexdigest()[:24]
+    prompt_tokens = sum(len(json.dumps(m.get('content', '')).split()) for m in payload['messages'])
+    completion_tokens = len(text.split())
+
+    if provider == 'anthropic':
+        return {
+            'id': f"msg_{request_id}",
+            'type': 'message',
+            'role': 'assistant',
+            'model': payload['model'],
+            'content': [{'type': 'text', 'text': text}],
+            'stop_reason': 'end_turn',
+            'stop_sequence': None,
+            'usage': {'input_tokens': prompt_tokens, 'output_tokens': completion_tokens}
+        }
+    return {
+        'id': f"chatcmpl-{request_id}",
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': payload['model'],
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': text},
+            'logprobs': None,
+            'finish_reason': 'stop'
+        }],
+        'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                  'total_tokens': prompt_tokens + completion_tokens}
+    }
+
+
+def _echo_completion(payload: Dict) -> Dict:
+    """Legacy completion echoing each prompt with deterministic per-word logprobs"""
+    prompts = payload['prompt'] if isinstance(payload['prompt'], list) else [payload['prompt']]
+    choices = []
+    for index, prompt in enumerate(prompts):
+        words = list(re.finditer(r'\s*\S+', prompt))
+        log_probs = [-1 - hashlib.sha256(w.group().encode()).digest()[0] / 32 for w in words]
+        choices.append({
+            'index': index,
+            'text': prompt if payload.get('echo') else '',
+            'logprobs': {
+                'tokens': [w.group() for w in words],
+                'token_logprobs': [None] + log_probs[1:],
+                'top_logprobs': None,
+                'text_offset': [w.start() for w in words]
+            },
+            'finish_reason': 'length'
+        })
+    tokens = sum(len(choice['logprobs']['tokens']) for choice in choices)
+    return {
+        'id': f"cmpl-{uuid.uuid4().hex[:24]}",
+        'object': 'text_completion',
+        'created': int(time.time()),
+        'model': payload['model'],
+        'choices': choices,
+        'usage': {'prompt_tokens': tokens, 'completion_tokens': 0, 'total_tokens': tokens}
+    }
+
+
+def _handler(api: MockApi, batches: MockBatches):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _send(self, code, data: bytes, content_type: str, headers=None):
+            self.send_response(code)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _reply(self, code, body, headers=None):
+            self._send(code, json.dumps(body).encode(), 'application/json', headers)
+
+        def do_GET(self):
+            parts = urlparse(self.path).path.strip('/').split('/')
+            if parts == ['health']:
+                self._reply(200, api.counts)
+            elif parts[:2] == ['v1', 'batches'] and len(parts) == 3 and parts[2] in batches.jobs:
+                self._reply(200, batches.jobs[parts[2]])
+            elif parts[:2] == ['v1', 'files'] and parts[3:] == ['content'] and parts[2] in batches.files:
+                self._send(200, batches.files[parts[2]], 'application/octet-stream')
+            elif parts[:3] == ['v1', 'messages', 'batches'] and len(parts) >= 4 and parts[3] in batches.jobs:
+                job = batches.jobs[parts[3]]
+                if parts[4:] == ['results'] and job['_results'] is not None:
+                    self._send(200, job['_results'], 'application/binary')
+                elif len(parts) == 4:
+                    self._reply(200, batches.public(job))
+                else:
+                    self._reply(404, _error('anthropic', 'not_found_error', 'Results not ready'))
+            else:
+                self._reply(404, {'error': f"No route {self.path}"})
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            path = urlparse(self.path).path
+            if path == '/v1/files':
+                try:
+                    self._reply(200, batches.upload(*_multipart_file(self.headers['Content-Type'], body)))
+                except ValueError as e:
+                    self._reply(400, _error('openai', 'invalid_request_error', str(e)))
+                return
+
+            provider = ROUTES.get(path) or BATCH_ROUTES.get(path)
+            if provider is None:
+                self._reply(404, {'error': f"No route {self.path}"})
+                return
+            try:
+                payload = json.loads(body)
+            except ValueError as e:
+                self._reply(400, _error(provider, 'invalid_request_error', str(e)))
+                return
+
+            if path in BATCH_ROUTES:
+                create = batches.create_openai if provider == 'openai' else batches.create_anthropic
+                self._reply(*create(payload))
+            else:
+                status, headers, response = api.handle(provider, payload)
+                self._reply(status, response, headers)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start(url: str = MOCK_API_URL, api: Optional[MockApi] = None) -> ThreadingHTTPServer:
+    """Serve in a background thread; call .shutdown() on the result to stop"""
+    address = urlparse(url)
+    api = api or MockApi()
+    httpd = ThreadingHTTPServer((address.hostname, address.port), _handler(api, MockBatches(api, url)))
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+
+def client_urls(url: str = MOCK_API_URL) -> Dict[str, str]:
+    """base_url of each provider's SDK client when talking to the mock"""
+    return {'openai': f"{url}/v1", 'anthropic': url}
+
+
+def benchmark(requests: int = 200, url: str = MOCK_API_URL, concurrency: Optional[int] = None) -> Dict:
+    """Time an api_harness sweep of distinct prompts against a running mock"""
+    from api_harness import ApiHarness, PROVIDERS, chat, run_requests
+
+    for provider in PROVIDERS:
+        os.environ.setdefault(f'{provider.upper()}_API_KEY', 'mock')
+    harness = ApiHarness(
+        concurrency={provider: concurrency for provider in PROVIDERS} if concurrency else None,
+        base_urls=client_urls(url),
+        cache_mode='off'
+    )
+    batch = [chat(PROVIDERS[i % len(PROVIDERS)], f"Complete with one word: prompt {i} ___", max_tokens=5)
+             for i in range(requests)]
+
+    start_time = time.perf_counter()
+    replies = run_requests(batch, harness)
+    elapsed = time.perf_counter() - start_time
+    return {
+        'requests': requests,
+        'seconds': elapsed,
+        'requests_per_second': requests / elapsed,
+        'failed': sum(isinstance(r, Exception) for r in replies),
+        'calls': harness.calls,
+        'retries': harness.retries
+    }
+
+
+if __name__ == "__main__":
+    requests = int(os.getenv('MOCK_API_BENCHMARK', '0'))
+    httpd = start()
+    print(f"Mock API listening on {MOCK_API_URL} (latency {LATENCY}, "
+          f"rps {RATE_LIMIT or 'unlimited'}, failure rate {FAILURE_RATE})")
+
+    if requests:
+        for name, value in benchmark(requests).items():
+            print(f"  {name}: {value:.2f}" if isinstance(value, float) else f"  {name}: {value}")
+        httpd.shutdown()
+    else:
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            httpd.shutdown()
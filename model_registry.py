@@ -0,0 +1,108 @@
+"""
+Process-wide registry of masked-LM (and causal-LM) checkpoints
+Every script and scorer asks here for its (tokenizer, model), so each checkpoint
+is loaded lazily at most once per process, however many modules import it
+"""
+
+from transformers import AutoModelForCausalLM, AutoModelForMaskedLM, AutoTokenizer
+import gc
+import os
+import threading
+import torch
+from typing import List, Optional
+
+# fp32 - the checkpoint as published
+# int8 - dynamic int8 quantization of every nn.Linear, for CPU-only inference
+# onnx - the checkpoint exported to ONNX and run by ONNX Runtime on CPU
+VARIANTS = ('fp32', 'int8', 'onnx')
+
+# Variant used by scorers that don't ask for one (e.g. MLM_VARIANT=onnx)
+DEFAULT_VARIANT = os.getenv('MLM_VARIANT', 'fp32')
+
+_tokenizers = {}
+_models = {}
+_lock = threading.RLock()
+
+
+def get_tokenizer(model_name: str):
+    """Tokenizer for model_name, loaded on first request"""
+    with _lock:
+        if model_name not in _tokenizers:
+            _tokenizers[model_name] = AutoTokenizer.from_pretrained(model_name)
+        return _tokenizers[model_name]
+
+
+def get_model(model_name: str, variant: Optional[str] = None):
+    """(tokenizer, model) for model_name in eval mode, loaded on first request"""
+    variant = variant or DEFAULT_VARIANT
+    if variant not in VARIANTS:
+        raise ValueError(f"Unknown variant '{variant}', expected one of {VARIANTS}")
+    with _lock:
+        if (model_name, variant) not in _models:
+            if variant == 'onnx':
+                from onnx_backend import load_onnx_model
+                model = load_onnx_model(model_name)
+            else:
+                model = AutoModelForMaskedLM.from_pretrained(model_name)
+                model.eval()
+                if variant == 'int8':
+                    model = quantize_int8(model)
+            _models[(model_name, variant)] = model
+        return get_tokenizer(model_name), _models[(model_name, variant)]
+
+
+def get_causal_model(model_name: str):
+    """
+    (tokenizer, model) for an autoregressive checkpoint such as gpt2, in eval
+    mode; kept alongside the masked LMs under the variant name 'causal'
+    """
+    with _lock:
+        if (model_name, 'causal') not in _models:
+            model = AutoModelForCausalLM.from_pretrained(model_name)
+            model.eval()
+            _models[(model_name, 'causal')] = model
+        return get_tokenizer(model_name), _models[(model_name, 'causal')]
+
+
+def quantize_int8(model):
+    """
+    Dynamic int8 quantization of the Linear layers (weights int8, activations
+    quantized on the fly), which covers attention, feed-forward and LM head
+    projections in BERT, RoBERTa, ALBERT and DistilBERT
+    """
+    if torch.backends.quantized.engine == 'none':
+        engines = [e for e in torch.backends.quantized.supported_engines if e != 'none']
+        if not engines:
+            raise RuntimeError("This torch build has no quantized CPU engine")
+        torch.backends.quantized.engine = engines[0]
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def is_loaded(model_name: str, variant: Optional[str] = None) -> bool:
+    return (model_name, variant or DEFAULT_VARIANT) in _models
+
+
+def loaded_models() -> List[str]:
+    """Checkpoints whose weights are currently resident, as name or name:variant"""
+    with _lock:
+        return [name if variant == 'fp32' else f"{name}:{variant}" for name, variant in _models]
+
+
+def evict(model_name: Optional[str] = None, variant: Optional[str] = None):
+    """
+    Drop one checkpoint (all its variants unless one is given), or everything
+    Memory is only returned once no caller still holds a reference to the model
+    """
+    with _lock:
+        for name, loaded_variant in list(_models):
+            if model_name is not None and name != model_name:
+                continue
+            if variant is not None and loaded_variant != variant:
+                continue
+            del _models[(name, loaded_variant)]
+        if variant is None:
+            if model_name is None:
+                _tokenizers.clear()
+            else:
+                _tokenizers.pop(model_name, None)
+    gc.collect()
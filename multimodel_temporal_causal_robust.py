@@ -4,8 +4,8 @@ Following methodology from Rogers et al. (2020) - A Primer on Neural Network Arc
 ROBUST VERSION: Better test cases and error handling
 """
 
-from transformers import AutoModelForMaskedLM, AutoTokenizer
-import torch
+from mlm_scoring import MaskedLMScorer
+from target_vocab import alignment_table, comparable_words
 import numpy as np
 from scipy import stats
 import json
@@ -36,93 +36,62 @@ print(f"Testing {len(test_pairs)} paired temporal-causal tests")
 print(f"Models: {', '.join(models_to_test)}")
 print("=" * 70)
 
-for model_name in models_to_test:
+# Every stimulus goes through each model in one batched sweep
+stimuli = []
+targets = []
+kinds = []
+for temp_test, temp_ans, caus_test, caus_ans in test_pairs:
+    stimuli.extend([temp_test, caus_test])
+    targets.extend([[temp_ans], [caus_ans]])
+    kinds.extend(['temporal', 'causal'])
+
+# Run with MLM_VARIANT=onnx to score through ONNX Runtime (exported once, cached)
+scorer = MaskedLMScorer(models_to_test)
+table = scorer.score(stimuli, targets)
+
+# Ranks are first-piece ranks, so they are only compared for targets every
+# vocabulary keeps as one in-context piece
+alignment = alignment_table(list(dict.fromkeys(t for ts in targets for t in ts)), models_to_test)
+aligned = set(comparable_words(alignment))
+for row in alignment[~alignment['word'].isin(aligned)].itertuples():
+    print(f"  {row.word} is {row.pieces} pieces in {row.model}: {row.tokens} (excluded from ranks)")
+
+for model_name, model_table in table.groupby('model', sort=False):
     print(f"\nTesting {model_name}...")
     print("-" * 40)
     
-    try:
-        tokenizer = AutoTokenizer.from_pretrained(model_name)
-        model = AutoModelForMaskedLM.from_pretrained(model_name)
-        model.eval()
-        
-        temporal_correct = 0
-        causal_correct = 0
-        temporal_punct = 0
-        causal_punct = 0
-        temporal_ranks = []
-        causal_ranks = []
-        
-        for temp_test, temp_ans, caus_test, caus_ans in test_pairs:
-            # Adjust mask token for different models
-            mask_token = '<mask>' if 'roberta' in model_name else '[MASK]'
-            temp_test = temp_test.replace('[MASK]', mask_token)
-            caus_test = caus_test.replace('[MASK]', mask_token)
-            
-            # Test temporal
-            inputs = tokenizer(temp_test, return_tensors='pt')
-            with torch.no_grad():
-                outputs = model(**inputs)
-            
-            mask_idx = (inputs['input_ids'] == tokenizer.mask_token_id).nonzero()[0,1]
-            probs = torch.softmax(outputs.logits[0, mask_idx], dim=-1)
-            top_id = probs.argmax().item()
-            top_word = tokenizer.decode([top_id]).strip()
-            
-            # Get rank of expected word
-            try:
-                temp_ans_id = tokenizer.encode(temp_ans, add_special_tokens=False)[0]
-                temp_rank = (probs.argsort(descending=True) == temp_ans_id).nonzero().item()
-                temporal_ranks.append(temp_rank)
-            except:
-                temporal_ranks.append(999)
-            
-            if top_word.lower() == temp_ans.lower():
-                temporal_correct += 1
-                print(f"  ✓ Temporal: '{temp_test}' → '{top_word}'")
-            elif top_word in '.,;!?:':
-                temporal_punct += 1
-                print(f"  PUNCT Temporal: '{temp_test}' → '{top_word}'")
-            else:
-                print(f"  ✗ Temporal: '{temp_test}' → '{top_word}' (expected '{temp_ans}')")
-            
-            # Test causal
-            inputs = tokenizer(caus_test, return_tensors='pt')
-            with torch.no_grad():
-                outputs = model(**inputs)
-            
-            mask_idx = (inputs['input_ids'] == tokenizer.mask_token_id).nonzero()[0,1]
-            probs = torch.softmax(outputs.logits[0, mask_idx], dim=-1)
-            top_id = probs.argmax().item()
-            top_word = tokenizer.decode([top_id]).strip()
-            
-            # Get rank of expected word
-            try:
-                caus_ans_id = tokenizer.encode(caus_ans, add_special_tokens=False)[0]
-                caus_rank = (probs.argsort(descending=True) == caus_ans_id).nonzero().item()
-                causal_ranks.append(caus_rank)
-            except:
-                causal_ranks.append(999)
-            
-            if top_word.lower() == caus_ans.lower():
-                causal_correct += 1
-                print(f"  ✓ Causal: '{caus_test}' → '{top_word}'")
-            elif top_word in '.,;!?:':
-                causal_punct += 1
-                print(f"  PUNCT Causal: '{caus_test}' → '{top_word}'")
-            else:
-                print(f"  ✗ Causal: '{caus_test}' → '{top_word}' (expected '{caus_ans}')")
-        
-        results_by_model[model_name] = {
-            'temporal_acc': temporal_correct / len(test_pairs),
-            'causal_acc': causal_correct / len(test_pairs),
-            'temporal_punct': temporal_punct / len(test_pairs),
-            'causal_punct': causal_punct / len(test_pairs),
-            'temporal_avg_rank': np.mean(temporal_ranks),
-            'causal_avg_rank': np.mean(causal_ranks)
-        }
+    correct = {'temporal': 0, 'causal': 0}
+    punct = {'temporal': 0, 'causal': 0}
+    punct_mass = {'temporal': [], 'causal': []}
+    ranks = {'temporal': [], 'causal': []}
+    
+    for row in model_table.itertuples():
+        kind = kinds[row.stimulus_id]
+        label = kind.capitalize()
+        top_word = row.top_prediction
+        punct_mass[kind].append(row.punctuation_mass)
+        if row.target in aligned:
+            ranks[kind].append(row.target_rank)
         
-    except Exception as e:
-        print(f"  Error loading model: {e}")
+        if top_word.lower() == row.target.lower():
+            correct[kind] += 1
+            print(f"  ✓ {label}: '{row.stimulus}' → '{top_word}'")
+        elif row.top_class == 'punctuation':
+            punct[kind] += 1
+            print(f"  PUNCT {label}: '{row.stimulus}' → '{top_word}'")
+        else:
+            print(f"  ✗ {label}: '{row.stimulus}' → '{top_word}' (expected '{row.target}')")
+    
+    results_by_model[model_name] = {
+        'temporal_acc': correct['temporal'] / len(test_pairs),
+        'causal_acc': correct['causal'] / len(test_pairs),
+        'temporal_punct': punct['temporal'] / len(test_pairs),
+        'causal_punct': punct['causal'] / len(test_pairs),
+        'temporal_punct_mass': np.mean(punct_mass['temporal']),
+        'causal_punct_mass': np.mean(punct_mass['causal']),
+        'temporal_avg_rank': np.mean(ranks['temporal']) if ranks['temporal'] else float('nan'),
+        'causal_avg_rank': np.mean(ranks['causal']) if ranks['causal'] else float('nan')
+    }
 
 # Statistical analysis
 print("\n" + "=" * 70)
@@ -132,9 +101,11 @@ print("-" * 40)
 summary_table = []
 for model_name, results in results_by_model.items():
     print(f"\n{model_name}:")
-    print(f"  Temporal: {results['temporal_acc']:.0%} correct, {results['temporal_punct']:.0%} punctuation")
+    print(f"  Temporal: {results['temporal_acc']:.0%} correct, {results['temporal_punct']:.0%} punctuation "
+          f"({results['temporal_punct_mass']:.0%} of probability mass)")
     print(f"    Average rank: {results['temporal_avg_rank']:.1f}")
-    print(f"  Causal: {results['causal_acc']:.0%} correct, {results['causal_punct']:.0%} punctuation")
+    print(f"  Causal: {results['causal_acc']:.0%} correct, {results['causal_punct']:.0%} punctuation "
+          f"({results['causal_punct_mass']:.0%} of probability mass)")
     print(f"    Average rank: {results['causal_avg_rank']:.1f}")
     
     summary_table.append([
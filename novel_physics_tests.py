@@ -46,17 +46,16 @@ NOVEL_TESTS = {
     }
 }
 
+pairs = [(t['normal'], t['violation'], t['target']) for t in NOVEL_TESTS.values()]
+pair_results = dict(zip(NOVEL_TESTS, detector.test_violation_pairs(pairs)))
+
 results = {}
 for test_name, test_data in NOVEL_TESTS.items():
     print(f"\n{test_name.upper()}")
     print(f"Normal:    {test_data['normal']}")
     print(f"Violation: {test_data['violation']}")
     
-    result = detector.test_violation_pair(
-        test_data['normal'],
-        test_data['violation'],
-        test_data['target']
-    )
+    result = pair_results[test_name]
     
     results[test_name] = result['difference']
     print(f"Difference: {result['difference']:.3f} ({'✓' if result['difference'] > 0 else '✗'})")
@@ -3,13 +3,12 @@ Can we hack prompts to make object prediction work?
 Testing various strategies to privilege object words
 """
 
-from transformers import AutoModelForMaskedLM, AutoTokenizer
-import torch
 import numpy as np
+from mlm_scoring import MaskedLMScorer
+from target_vocab import resolver
 
-tokenizer = AutoTokenizer.from_pretrained('bert-base-uncased')
-model = AutoModelForMaskedLM.from_pretrained('bert-base-uncased')
-model.eval()
+scorer = MaskedLMScorer(['bert-base-uncased'])
+tokenizer = scorer.tokenizer('bert-base-uncased')
 
 print("=" * 70)
 print("HUNTING FOR OBJECT-PRIVILEGED PROMPT PATTERNS")
@@ -57,21 +56,14 @@ strategies = {
 results = []
 
 for strategy_name, strategy in strategies.items():
-    inputs = tokenizer(strategy['template'], return_tensors='pt')
-    
-    with torch.no_grad():
-        outputs = model(**inputs)
-    
-    mask_idx = (inputs['input_ids'] == tokenizer.mask_token_id).nonzero()[0,1]
-    probs = torch.softmax(outputs.logits[0, mask_idx], dim=-1)
-    
-    # Check if target word is predicted
-    target_id = tokenizer.encode(strategy['target'], add_special_tokens=False)[0]
-    target_prob = probs[target_id].item()
-    target_rank = (probs.argsort(descending=True) == target_id).nonzero().item()
+    # Check if target word is predicted (log prob and rank from one gather)
+    target_id = resolver(tokenizer).first_id(strategy['target'])
+    entry = scorer.score_entries('bert-base-uncased', [strategy['template']], [[target_id]])[0]
+    target_log_prob, target_rank = entry['targets'][target_id]
+    target_prob = float(np.exp(target_log_prob))
     
     # Get top prediction
-    top_pred_id = probs.argmax().item()
+    top_pred_id = entry['top_k'][0][0]
     top_pred_word = tokenizer.decode([top_pred_id])
     
     results.append({
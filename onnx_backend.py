@@ -0,0 +1,130 @@
+"""
+ONNX Runtime backend for masked-LM scoring
+Each checkpoint is exported once to ONNX (dynamic batch and sequence axes),
+cached on disk, and run through ORT's CPU execution provider behind the same
+model(input_ids=..., attention_mask=...).logits interface the scorers use
+"""
+
+from transformers import AutoModelForMaskedLM
+from transformers.modeling_outputs import MaskedLMOutput
+import os
+import torch
+from typing import Optional
+
+ONNX_CACHE_DIR = os.getenv(
+    'ONNX_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'embodied-cognition', 'onnx')
+)
+
+ONNX_OPSET = 14
+
+
+class _LogitsOnly(torch.nn.Module):
+    """Export wrapper: (input_ids, attention_mask) -> logits"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+
+def onnx_path(model_name: str) -> str:
+    return os.path.join(ONNX_CACHE_DIR, model_name.replace('/', '--'), 'model.onnx')
+
+
+def export_onnx(model_name: str, path: Optional[str] = None) -> str:
+    """Export model_name to ONNX unless a cached export already exists"""
+    path = path or onnx_path(model_name)
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    model = AutoModelForMaskedLM.from_pretrained(model_name)
+    model.eval()
+
+    dummy_ids = torch.ones((2, 8), dtype=torch.long)
+    dummy_mask = torch.ones((2, 8), dtype=torch.long)
+    tmp_path = path + '.tmp'
+    torch.onnx.export(
+        _LogitsOnly(model), (dummy_ids, dummy_mask), tmp_path,
+        input_names=['input_ids', 'attention_mask'],
+        output_names=['logits'],
+        dynamic_axes={
+            'input_ids': {0: 'batch', 1: 'sequence'},
+            'attention_mask': {0: 'batch', 1: 'sequence'},
+            'logits': {0: 'batch', 1: 'sequence'}
+        },
+        opset_version=ONNX_OPSET,
+        dynamo=False
+    )
+    os.replace(tmp_path, path)
+    return path
+
+
+class OnnxMaskedLM:
+    """Callable stand-in for AutoModelForMaskedLM backed by an ORT session"""
+
+    def __init__(self, path: str, num_threads: Optional[int] = None):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError("ONNX backend needs onnxruntime. Run: pip install onnxruntime")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+
+    def eval(self):
+        return self
+
+    def __call__(self, input_ids, attention_mask, **kwargs) -> MaskedLMOutput:
+        (logits,) = self.session.run(['logits'], {
+            'input_ids': input_ids.numpy(),
+            'attention_mask': attention_mask.numpy()
+        })
+        return MaskedLMOutput(logits=torch.from_numpy(logits))
+
+
+def load_onnx_model(model_name: str) -> OnnxMaskedLM:
+    """ORT session for model_name, exporting it on first use"""
+    return OnnxMaskedLM(export_onnx(model_name))
+
+
+if __name__ == "__main__":
+    import time
+    from mlm_scoring import LOCAL_MODELS, MaskedLMScorer
+
+    print("=" * 70)
+    print("ONNX RUNTIME VS PYTORCH")
+    print("=" * 70)
+
+    stimuli = [
+        "Yesterday comes before [MASK]", "Heat melts [MASK]", "Spring follows [MASK]",
+        "Rain makes things [MASK]", "Past, present, [MASK]", "Gravity pulls objects [MASK]",
+        "Monday, Tuesday, [MASK]", "Fire causes [MASK]", "First, second, [MASK]",
+        "Seeds grow into [MASK]"
+    ] * 10
+
+    for model_name in LOCAL_MODELS:
+        print(f"\n{model_name}:")
+        try:
+            print(f"  Export: {export_onnx(model_name)}")
+            timings = {}
+            for variant in ['fp32', 'onnx']:
+                scorer = MaskedLMScorer([model_name], use_cache=False, variant=variant)
+                scorer.load(model_name)
+                start = time.perf_counter()
+                rows = scorer.score_model(model_name, stimuli)
+                timings[variant] = time.perf_counter() - start
+                timings[variant + '_top'] = [r['top_prediction'] for r in rows]
+            agree = sum(a == b for a, b in zip(timings['fp32_top'], timings['onnx_top'])) / len(stimuli)
+            print(f"  PyTorch: {len(stimuli) / timings['fp32']:.1f} stimuli/s")
+            print(f"  ONNX:    {len(stimuli) / timings['onnx']:.1f} stimuli/s "
+                  f"({timings['fp32'] / timings['onnx']:.2f}x)")
+            print(f"  Top-1 agreement: {agree:.0%}")
+        except Exception as e:
+            print(f"  Error: {e}")
@@ -3,57 +3,146 @@ Physics Violation Detection using Retroactive Updates
 Based on Spelke et al. (1992) and Baillargeon (2004)
 """
 
-import torch
-from transformers import AutoModelForMaskedLM, AutoTokenizer
 import numpy as np
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+from mlm_cache import default_cache, model_fingerprint
+from mlm_scoring import score_candidates, score_spans_encoded, tokenize_masked
+from model_registry import DEFAULT_VARIANT, get_model, get_tokenizer
+from scoring_server import ScoringClient
 
 class PhysicsViolationDetector:
     """Detect physics violations using retroactive update magnitude"""
     
-    def __init__(self, model_name='bert-base-uncased'):
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.model = AutoModelForMaskedLM.from_pretrained(model_name)
-        self.model.eval()
+    def __init__(self, model_name='bert-base-uncased', use_cache: bool = True,
+                 span_mode: str = 'pll', variant: Optional[str] = None,
+                 server_url: Optional[str] = None):
+        self.model_name = model_name
+        self.tokenizer = get_tokenizer(model_name)
+        # Targets split into several sub-tokens are scored as whole words
+        self.span_mode = span_mode
+        # 'int8' (quantized) or 'onnx' (ONNX Runtime) for faster CPU inference
+        self.variant = variant or DEFAULT_VARIANT
+        
+        # Client mode: a running scoring_server does the scoring (and caching),
+        # so this process never loads the model
+        self.client = ScoringClient(server_url) if server_url else None
+        
+        # Cached outputs let reruns skip loading the model entirely
+        use_cache = use_cache and self.client is None
+        self.cache = default_cache() if use_cache else None
+        self.fingerprint = model_fingerprint(model_name, self.tokenizer, variant=self.variant) if use_cache else None
+    
+    @property
+    def model(self):
+        """Masked LM from the shared registry, loaded when an uncached stimulus needs it"""
+        return get_model(self.model_name, self.variant)[1]
     
     def measure_surprise(self, sentence: str, target_word: str) -> float:
         """
         Measure surprise at target word after physics statement
         Higher surprise = stronger violation detection
         """
-        # Mask the target word
-        words = sentence.split()
-        target_idx = words.index(target_word)
-        words[target_idx] = '[MASK]'
-        masked_sentence = ' '.join(words)
-        
-        # Get predictions
-        inputs = self.tokenizer(masked_sentence, return_tensors='pt')
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-            predictions = outputs.logits
+        return float(self.measure_surprise_batch([sentence], [target_word])[0])
+
+    def measure_surprise_batch(self, sentences: List[str], targets: List[str],
+                               batch_size: int = 32) -> np.ndarray:
+        """
+        Measure surprise for many (sentence, target) stimuli at once
+        Stimuli are padded into batches of batch_size and scored in one
+        forward pass per batch; surprisals come back in input order
+        """
+        if len(sentences) != len(targets):
+            raise ValueError(f"Got {len(sentences)} sentences but {len(targets)} targets")
         
-        # Get probability of actual word
-        masked_idx = (inputs['input_ids'] == self.tokenizer.mask_token_id).nonzero()[0, 1]
-        target_id = self.tokenizer.encode(target_word, add_special_tokens=False)[0]
+        # Mask the target word in every sentence
+        masked_sentences = []
+        for sentence, target_word in zip(sentences, targets):
+            words = sentence.split()
+            target_idx = words.index(target_word)
+            words[target_idx] = '[MASK]'
+            masked_sentences.append(' '.join(words))
         
-        probs = torch.softmax(predictions[0, masked_idx], dim=-1)
-        target_prob = probs[target_id].item()
+        sequences, positions = tokenize_masked(self.tokenizer, masked_sentences)
+        return self.measure_surprise_encoded(sequences, positions, targets, batch_size=batch_size)
+
+    def measure_surprise_encoded(self, sequences: List[List[int]], positions: List[int],
+                                 targets: List[str], batch_size: int = 32) -> np.ndarray:
+        """
+        Surprise at targets[i] masked at positions[i] of already tokenized inputs
+        (e.g. spliced from a SlotTemplate)
+        """
+        if self.client is not None:
+            entries = self.client.score(
+                self.model_name, targets=[[target] for target in targets],
+                sequences=sequences, positions=positions, span_mode=self.span_mode
+            )
+        else:
+            entries = score_spans_encoded(
+                self.tokenizer, lambda: self.model, sequences, positions,
+                [[target] for target in targets],
+                mode=self.span_mode,
+                batch_size=batch_size,
+                cache=self.cache,
+                fingerprint=self.fingerprint
+            )
         
-        # Return negative log prob (higher = more surprising)
-        return -np.log(target_prob + 1e-10)
+        # Negative log prob (higher = more surprising), exact rather than via probabilities
+        return -np.array([entry['targets'][t]['log_prob'] for entry, t in zip(entries, targets)])
+
+    def candidate_surprise(self, templates: List[str], candidates: List[List[str]],
+                           batch_size: int = 32) -> List[Dict[str, float]]:
+        """
+        Surprise of each candidate word at the [MASK] of each template
+        Only the candidates' rows of the LM head are projected (plus the
+        exact normalizer), so this is cheaper than measure_surprise_batch;
+        cached like it, so reruns never load the model
+        """
+        if self.client is not None:
+            entries = [entry['targets'] for entry in self.client.score(
+                self.model_name, templates, candidates, operation='candidates', span_mode=self.span_mode
+            )]
+        else:
+            entries = score_candidates(
+                self.tokenizer, lambda: self.model, templates, candidates,
+                mode=self.span_mode,
+                batch_size=batch_size,
+                cache=self.cache,
+                fingerprint=self.fingerprint
+            )
+        return [
+            {word: -scored['log_prob'] for word, scored in entry.items()}
+            for entry in entries
+        ]
 
     def test_violation_pair(self, normal: str, violation: str, target: str) -> Dict:
         """Compare normal physics vs violation"""
-        normal_surprise = self.measure_surprise(normal, target)
-        violation_surprise = self.measure_surprise(violation, target)
+        return self.test_violation_pairs([(normal, violation, target)])[0]
+
+    def test_violation_pairs(self, pairs: List[Tuple[str, str, str]],
+                             batch_size: int = 32) -> List[Dict]:
+        """
+        Compare many (normal, violation, target) pairs in stacked batches
+        Both halves of every pair go through the same forward pass
+        """
+        sentences = []
+        targets = []
+        for normal, violation, target in pairs:
+            sentences.extend([normal, violation])
+            targets.extend([target, target])
         
-        return {
-            'normal_surprise': normal_surprise,
-            'violation_surprise': violation_surprise,
-            'difference': violation_surprise - normal_surprise,
-            'detects_violation': violation_surprise > normal_surprise
-        }
+        surprisals = self.measure_surprise_batch(sentences, targets, batch_size=batch_size)
+        
+        results = []
+        for normal_surprise, violation_surprise in surprisals.reshape(-1, 2):
+            normal_surprise = float(normal_surprise)
+            violation_surprise = float(violation_surprise)
+            results.append({
+                'normal_surprise': normal_surprise,
+                'violation_surprise': violation_surprise,
+                'difference': violation_surprise - normal_surprise,
+                'detects_violation': violation_surprise > normal_surprise
+            })
+        return results
 
 # Core physics tests from infant research
 PHYSICS_TESTS = {
@@ -90,20 +179,15 @@ def run_infant_baseline_tests():
     print("=" * 60)
     
     detector = PhysicsViolationDetector()
-    results = {}
+    pairs = [(t['normal'], t['violation'], t['target']) for t in PHYSICS_TESTS.values()]
+    results = dict(zip(PHYSICS_TESTS, detector.test_violation_pairs(pairs)))
     
     for test_name, test_data in PHYSICS_TESTS.items():
         print(f"\n📊 {test_name.upper()}")
         print(f"Normal:    {test_data['normal']}")
         print(f"Violation: {test_data['violation']}")
         
-        result = detector.test_violation_pair(
-            test_data['normal'],
-            test_data['violation'],
-            test_data['target']
-        )
-        
-        results[test_name] = result
+        result = results[test_name]
         
         print(f"Surprise difference: {result['difference']:.3f}")
         print(f"Detects violation: {'✓' if result['detects_violation'] else '✗'}")
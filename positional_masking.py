@@ -0,0 +1,63 @@
+"""
+All-positions masking for positional rank experiments
+Every word of every sentence is masked in turn, and all N masked variants
+go through the model as padded batches instead of one pass per word
+"""
+
+import numpy as np
+import pandas as pd
+from typing import List, Sequence, Tuple
+from mlm_scoring import MASK_PLACEHOLDER, MaskedLMScorer
+from target_vocab import resolver
+
+POSITION_COLUMNS = [
+    'sentence_id', 'position', 'word', 'target_rank', 'target_log_prob', 'top_ids'
+]
+
+
+def masked_variants(sentence: str) -> List[Tuple[str, str]]:
+    """(masked sentence, original word) for each whitespace-separated position"""
+    words = sentence.split()
+    return [
+        (' '.join(MASK_PLACEHOLDER if j == i else w for j, w in enumerate(words)), word)
+        for i, word in enumerate(words)
+    ]
+
+
+def score_positions(sentences: Sequence[str], model_name: str = 'bert-base-uncased',
+                    scorer: MaskedLMScorer = None) -> pd.DataFrame:
+    """
+    Rank of the original word at every masked position of every sentence
+    Returns one row per (sentence, position); top_ids holds the model's top tokens
+    """
+    scorer = scorer or MaskedLMScorer([model_name], batch_size=64)
+    target_resolver = resolver(scorer.tokenizer(model_name))
+
+    stimuli = []
+    target_ids = []
+    keys = []
+    for sentence_id, sentence in enumerate(sentences):
+        for position, (masked, word) in enumerate(masked_variants(sentence)):
+            stimuli.append(masked)
+            target_ids.append([target_resolver.first_id(word, sentence_initial=position == 0)])
+            keys.append((sentence_id, position, word))
+
+    entries = scorer.score_entries(model_name, stimuli, target_ids)
+
+    rows = []
+    for (sentence_id, position, word), ids, entry in zip(keys, target_ids, entries):
+        log_prob, rank = entry['targets'][ids[0]]
+        rows.append({
+            'sentence_id': sentence_id,
+            'position': position,
+            'word': word,
+            'target_rank': rank,
+            'target_log_prob': log_prob,
+            'top_ids': [token_id for token_id, _ in entry['top_k']]
+        })
+    return pd.DataFrame(rows, columns=POSITION_COLUMNS)
+
+
+def rank_matrix(table: pd.DataFrame) -> np.ndarray:
+    """Sentence × position matrix of ranks, NaN-padded for shorter sentences"""
+    return table.pivot(index='sentence_id', columns='position', values='target_rank').to_numpy(dtype=float)
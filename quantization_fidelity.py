@@ -0,0 +1,104 @@
+"""
+Does int8 dynamic quantization change our results?
+Compares fp32 and int8 scoring on the existing stimuli: rank agreement,
+top-1 agreement, surprise drift and CPU throughput
+"""
+
+import time
+import numpy as np
+from scipy import stats
+from mlm_scoring import LOCAL_MODELS, MaskedLMScorer
+from physics_violation_detector import PhysicsViolationDetector, PHYSICS_TESTS
+
+# Masked stimuli from multimodel_temporal_causal_robust.py and test_local_models.py
+STIMULI = [
+    ("Yesterday comes before [MASK]", ["today"]),
+    ("Spring follows [MASK]", ["winter"]),
+    ("Past, present, [MASK]", ["future"]),
+    ("Monday, Tuesday, [MASK]", ["wednesday"]),
+    ("First, second, [MASK]", ["third"]),
+    ("Heat melts [MASK]", ["ice"]),
+    ("Rain makes things [MASK]", ["wet"]),
+    ("Gravity pulls objects [MASK]", ["down"]),
+    ("Fire causes [MASK]", ["smoke"]),
+    ("Seeds grow into [MASK]", ["plants"]),
+    ("The rock fell [MASK] to the ground", ["down", "up"]),
+    ("The ball rolled behind the wall and [MASK] there", ["stayed", "vanished"]),
+    ("The book [MASK] on the table", ["rested", "floated"]),
+]
+
+
+def timed_score(scorer, model_name, stimuli, targets):
+    """Score once to warm up, then time a second uncached pass"""
+    scorer.load(model_name)
+    scorer.score_model(model_name, stimuli[:1], targets[:1])
+    start = time.perf_counter()
+    rows = scorer.score_model(model_name, stimuli, targets)
+    return rows, time.perf_counter() - start
+
+
+def compare_model(model_name):
+    stimuli = [s for s, _ in STIMULI]
+    targets = [t for _, t in STIMULI]
+
+    fp32_rows, fp32_time = timed_score(MaskedLMScorer([model_name], use_cache=False), model_name, stimuli, targets)
+    int8_rows, int8_time = timed_score(
+        MaskedLMScorer([model_name], use_cache=False, variant='int8'), model_name, stimuli, targets
+    )
+
+    # Multi-piece targets have no vocabulary rank (NaN) and are left out
+    fp32_ranks = np.array([r['target_rank'] for r in fp32_rows], dtype=float)
+    int8_ranks = np.array([r['target_rank'] for r in int8_rows], dtype=float)
+    ranked = ~np.isnan(fp32_ranks) & ~np.isnan(int8_ranks)
+    fp32_ranks, int8_ranks = fp32_ranks[ranked], int8_ranks[ranked]
+    surprise_drift = np.abs(np.array([r['target_surprise'] for r in fp32_rows]) -
+                            np.array([r['target_surprise'] for r in int8_rows]))
+    top1_agree = np.mean([a['top_prediction'] == b['top_prediction'] for a, b in zip(fp32_rows, int8_rows)])
+    rho, _ = stats.spearmanr(fp32_ranks, int8_ranks)
+
+    print(f"\n{model_name}:")
+    print(f"  Spearman rank agreement: {rho:.3f}")
+    print(f"  Identical ranks: {np.mean(fp32_ranks == int8_ranks):.0%}")
+    print(f"  Top-1 agreement: {top1_agree:.0%}")
+    print(f"  Surprise drift: mean {surprise_drift.mean():.3f}, max {surprise_drift.max():.3f} nats")
+    print(f"  Throughput: fp32 {len(stimuli) / fp32_time:.1f}/s, int8 {len(stimuli) / int8_time:.1f}/s "
+          f"({fp32_time / int8_time:.2f}x)")
+
+    return rho
+
+
+def compare_detector():
+    """Does quantization flip any violation-detection verdicts?"""
+    pairs = [(t['normal'], t['violation'], t['target']) for t in PHYSICS_TESTS.values()]
+    fp32 = PhysicsViolationDetector(use_cache=False).test_violation_pairs(pairs)
+    int8 = PhysicsViolationDetector(use_cache=False, variant='int8').test_violation_pairs(pairs)
+
+    print("\nPHYSICS_TESTS verdicts (bert-base-uncased):")
+    flips = 0
+    for test_name, a, b in zip(PHYSICS_TESTS, fp32, int8):
+        same = a['detects_violation'] == b['detects_violation']
+        flips += not same
+        print(f"  {test_name:18s}: fp32 {a['difference']:+.3f}, int8 {b['difference']:+.3f} "
+              f"{'✓' if same else '✗ verdict flipped'}")
+    print(f"  Verdicts flipped: {flips}/{len(pairs)}")
+
+
+if __name__ == "__main__":
+    print("=" * 70)
+    print("INT8 DYNAMIC QUANTIZATION FIDELITY")
+    print("=" * 70)
+
+    agreement = {}
+    for model_name in LOCAL_MODELS:
+        try:
+            agreement[model_name] = compare_model(model_name)
+        except Exception as e:
+            print(f"\n{model_name}: Error - {e}")
+
+    compare_detector()
+
+    print("\n" + "=" * 70)
+    if agreement and all(rho > 0.95 for rho in agreement.values()):
+        print("✓ int8 preserves rank order - safe for large sweeps")
+    else:
+        print("✗ int8 changes rankings - keep fp32 for reported numbers")
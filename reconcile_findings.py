@@ -34,16 +34,14 @@ tests_method2 = [
     ("The ball [MASK] there", "stayed", "vanished"),
 ]
 
-for template, normal_word, violation_word in tests_method2:
-    # Test normal
-    normal_sent = template.replace("[MASK]", normal_word)
-    normal_surprise = detector.measure_surprise(normal_sent, normal_word)
-    
-    # Test violation
-    violation_sent = template.replace("[MASK]", violation_word)
-    violation_surprise = detector.measure_surprise(violation_sent, violation_word)
-    
-    difference = violation_surprise - normal_surprise
+# Both words compete for the same mask, so only their LM-head rows are scored
+surprises = detector.candidate_surprise(
+    [template for template, _, _ in tests_method2],
+    [[normal_word, violation_word] for _, normal_word, violation_word in tests_method2]
+)
+
+for (template, normal_word, violation_word), surprise in zip(tests_method2, surprises):
+    difference = surprise[violation_word] - surprise[normal_word]
     print(f"'{normal_word}' vs '{violation_word}': difference = {difference:.3f}")
 
 print("\n" + "=" * 70)
@@ -0,0 +1,85 @@
+"""
+Resampling statistics over stimuli
+Vectorized bootstrap CIs and permutation tests (Efron & Tibshirani, 1993)
+Each stimulus is one observation: score it once, then resample the scores
+"""
+
+import numpy as np
+from typing import Callable, Dict, Tuple
+
+
+def cohens_d(values: np.ndarray, axis: int = -1) -> np.ndarray:
+    """One-sample Cohen's d against 0 (population standard deviation, as before)"""
+    values = np.asarray(values, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.mean(values, axis=axis) / np.std(values, axis=axis)
+
+
+def bootstrap_distribution(values, statistic: Callable = np.mean,
+                           n_resamples: int = 10000, seed: int = 0) -> np.ndarray:
+    """
+    Statistic over n_resamples bootstrap samples of the stimuli
+    All samples are drawn as one (n_resamples, n) index matrix;
+    statistic must accept an axis argument
+    """
+    values = np.asarray(values, dtype=float)
+    rng = np.random.default_rng(seed)
+    indices = rng.integers(0, len(values), size=(n_resamples, len(values)))
+    return statistic(values[indices], axis=1)
+
+
+def bootstrap_ci(values, statistic: Callable = np.mean, n_resamples: int = 10000,
+                 confidence: float = 0.95, seed: int = 0) -> Tuple[float, float]:
+    """Percentile bootstrap confidence interval for statistic"""
+    distribution = bootstrap_distribution(values, statistic, n_resamples, seed)
+    distribution = distribution[np.isfinite(distribution)]
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(distribution, [alpha, 1 - alpha])
+    return float(low), float(high)
+
+
+def sign_flip_test(values, n_resamples: int = 10000, seed: int = 0) -> float:
+    """
+    Two-sided permutation test that the mean difference is 0
+    Under H0 each difference is equally likely to have either sign; all 2^n
+    sign patterns are enumerated exactly when that is cheaper than sampling
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    observed = abs(values.mean())
+
+    if 2 ** n <= n_resamples:
+        patterns = (np.arange(2 ** n)[:, None] >> np.arange(n)) & 1
+        signs = 1 - 2 * patterns
+        null_means = np.abs((signs * values).mean(axis=1))
+        return float(np.mean(null_means >= observed - 1e-12))
+
+    rng = np.random.default_rng(seed)
+    signs = rng.choice([-1.0, 1.0], size=(n_resamples, n))
+    null_means = np.abs((signs * values).mean(axis=1))
+    return float((1 + np.sum(null_means >= observed - 1e-12)) / (n_resamples + 1))
+
+
+def min_sign_flip_p(n: int, n_resamples: int = 10000) -> float:
+    """
+    Smallest p sign_flip_test can return for n stimuli: the observed pattern
+    and its mirror image always tie, so the exact test can't go below 2 / 2^n
+    """
+    if 2 ** n <= n_resamples:
+        return 2 / 2 ** n
+    return 1 / (n_resamples + 1)
+
+
+def summarize(values, n_resamples: int = 10000, confidence: float = 0.95,
+              seed: int = 0) -> Dict:
+    """Mean and Cohen's d with bootstrap CIs, plus the sign-flip p-value"""
+    values = np.asarray(values, dtype=float)
+    return {
+        'n': len(values),
+        'mean': float(values.mean()),
+        'mean_ci': bootstrap_ci(values, np.mean, n_resamples, confidence, seed),
+        'cohens_d': float(cohens_d(values)),
+        'cohens_d_ci': bootstrap_ci(values, cohens_d, n_resamples, confidence, seed),
+        'p_permutation': sign_flip_test(values, n_resamples, seed),
+        'p_permutation_min': min_sign_flip_p(len(values), n_resamples)
+    }
@@ -3,19 +3,16 @@ Why does RoBERTa handle temporal (80%) but fail causal (20%)?
 Hypothesis: Different pretraining? Tokenization? Architecture?
 """
 
-from transformers import RobertaTokenizer, RobertaForMaskedLM, BertTokenizer, BertForMaskedLM
-import torch
+from mlm_scoring import MaskedLMScorer
 
 print("=" * 70)
 print("ROBERTA VS BERT: WHY THE DIFFERENCE?")
 print("=" * 70)
 
-# Load both models
-roberta_tokenizer = RobertaTokenizer.from_pretrained('roberta-base')
-roberta_model = RobertaForMaskedLM.from_pretrained('roberta-base')
-
-bert_tokenizer = BertTokenizer.from_pretrained('bert-base-uncased')
-bert_model = BertForMaskedLM.from_pretrained('bert-base-uncased')
+# Both models through the shared scorer (loaded once, outputs cached)
+scorer = MaskedLMScorer(['roberta-base', 'bert-base-uncased'])
+roberta_tokenizer = scorer.tokenizer('roberta-base')
+bert_tokenizer = scorer.tokenizer('bert-base-uncased')
 
 # Key differences to test
 print("\n1. TRAINING DATA DIFFERENCES:")
@@ -35,25 +32,20 @@ test_sentences = [
     ("Before and <mask>", "[MASK]", "after"),
 ]
 
+rob_entries = scorer.score_entries('roberta-base', [rob for rob, _, _ in test_sentences],
+                                   [[] for _ in test_sentences])
+bert_entries = scorer.score_entries('bert-base-uncased', [bert for _, bert, _ in test_sentences],
+                                    [[] for _ in test_sentences])
+
 print("\n3. TOKENIZATION TEST:")
-for roberta_sent, bert_sent, expected in test_sentences:
+for (roberta_sent, bert_sent, expected), rob_entry, bert_entry in zip(test_sentences, rob_entries, bert_entries):
     print(f"\n'{expected}' completion:")
     
     # RoBERTa
-    rob_inputs = roberta_tokenizer(roberta_sent, return_tensors='pt')
-    with torch.no_grad():
-        rob_outputs = roberta_model(**rob_inputs)
-    rob_mask_idx = (rob_inputs['input_ids'] == roberta_tokenizer.mask_token_id).nonzero()[0,1]
-    rob_probs = torch.softmax(rob_outputs.logits[0, rob_mask_idx], dim=-1)
-    rob_top = roberta_tokenizer.decode([rob_probs.argmax().item()])
+    rob_top = roberta_tokenizer.decode([rob_entry['top_k'][0][0]])
     
     # BERT
-    bert_inputs = bert_tokenizer(bert_sent, return_tensors='pt')
-    with torch.no_grad():
-        bert_outputs = bert_model(**bert_inputs)
-    bert_mask_idx = (bert_inputs['input_ids'] == bert_tokenizer.mask_token_id).nonzero()[0,1]
-    bert_probs = torch.softmax(bert_outputs.logits[0, bert_mask_idx], dim=-1)
-    bert_top = bert_tokenizer.decode([bert_probs.argmax().item()])
+    bert_top = bert_tokenizer.decode([bert_entry['top_k'][0][0]])
     
     print(f"  RoBERTa: '{rob_top.strip()}'")
     print(f"  BERT: '{bert_top.strip()}'")
@@ -0,0 +1,287 @@
+"""
+Warm masked-LM scoring server with dynamic micro-batching
+Keeps the local checkpoints resident in one process and serves fill-mask,
+surprise and rank requests over localhost HTTP; requests arriving within a
+short window are coalesced into one batched pass per model
+
+Start it once:   python scoring_server.py
+Then point scripts at it, e.g. PhysicsViolationDetector(server_url=SERVER_URL)
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import Future
+from urllib.parse import urlparse
+import json
+import math
+import os
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List, Optional, Sequence
+
+SERVER_URL = os.getenv('MLM_SERVER_URL', 'http://127.0.0.1:8765')
+
+# How long the first request of a micro-batch waits for company, and the cap on its size
+MAX_DELAY = float(os.getenv('MLM_SERVER_MAX_DELAY_MS', '10')) / 1000
+MAX_BATCH_ITEMS = 512
+
+OPERATIONS = ('spans', 'candidates')
+
+
+class _Request:
+    def __init__(self, sequences, positions, targets):
+        self.sequences = sequences
+        self.positions = positions
+        self.targets = targets
+        self.future = Future()
+
+
+# Server-side code imports the scoring engine lazily, so ScoringClient only
+# needs the standard library
+class ScoringServer:
+    """
+    Micro-batching front of the scoring engine
+    One queue and worker thread per (model, operation, span mode, normalize);
+    the worker takes the first waiting request, collects whatever else arrives
+    within max_delay (up to max_items inputs) and scores them all together
+    """
+
+    def __init__(self, model_names: Sequence[str] = None, variant: Optional[str] = None,
+                 max_delay: float = MAX_DELAY, max_items: int = MAX_BATCH_ITEMS,
+                 batch_size: int = 32, use_cache: bool = True):
+        from mlm_scoring import LOCAL_MODELS, MaskedLMScorer
+
+        self.model_names = list(model_names or LOCAL_MODELS)
+        self.scorer = MaskedLMScorer(self.model_names, batch_size=batch_size,
+                                     use_cache=use_cache, variant=variant)
+        self.max_delay = max_delay
+        self.max_items = max_items
+        self._queues = {}
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+
+    def warm(self):
+        """Load every configured checkpoint up front"""
+        for model_name in self.model_names:
+            print(f"Loading {model_name} ({self.scorer.variant})...")
+            self.scorer.load(model_name)
+
+    def submit(self, model_name: str, sequences: List[List[int]], positions: List[int],
+               targets: List[List[str]], operation: str = 'spans', span_mode: str = 'pll',
+               normalize: bool = True) -> Future:
+        if model_name not in self.model_names:
+            raise ValueError(f"Model '{model_name}' is not served, expected one of {self.model_names}")
+        if operation not in OPERATIONS:
+            raise ValueError(f"Unknown operation '{operation}', expected one of {OPERATIONS}")
+
+        key = (model_name, operation, span_mode, normalize)
+        with self._lock:
+            if key not in self._queues:
+                self._queues[key] = queue.Queue()
+                threading.Thread(target=self._serve, args=(key,), daemon=True).start()
+        request = _Request(sequences, positions, targets)
+        self._queues[key].put(request)
+        return request.future
+
+    def _serve(self, key):
+        model_name, operation, span_mode, normalize = key
+        waiting = self._queues[key]
+        while True:
+            pending = [waiting.get()]
+            size = len(pending[0].sequences)
+            deadline = time.monotonic() + self.max_delay
+            while size < self.max_items:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = waiting.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                pending.append(request)
+                size += len(request.sequences)
+
+            try:
+                entries = self._score(model_name, operation, span_mode, normalize,
+                                      [ids for r in pending for ids in r.sequences],
+                                      [p for r in pending for p in r.positions],
+                                      [t for r in pending for t in r.targets])
+            except Exception as e:
+                for request in pending:
+                    request.future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.requests += len(pending)
+            start = 0
+            for request in pending:
+                request.future.set_result(entries[start:start + len(request.sequences)])
+                start += len(request.sequences)
+
+    def _score(self, model_name, operation, span_mode, normalize, sequences, positions, targets):
+        from mlm_scoring import score_candidates_encoded, score_spans_encoded
+        from token_classes import token_classes
+
+        scorer = self.scorer
+        tokenizer = scorer.tokenizer(model_name)
+        load_model = lambda: scorer.load(model_name)[1]
+
+        if operation == 'candidates':
+            return [{'targets': scored} for scored in score_candidates_encoded(
+                tokenizer, load_model, sequences, positions, targets,
+                normalize=normalize, mode=span_mode,
+                batch_size=scorer.batch_size, max_tokens=scorer.max_tokens,
+                cache=scorer.cache,
+                fingerprint=scorer.fingerprint(model_name) if scorer.cache is not None else None
+            )]
+
+        entries = score_spans_encoded(
+            tokenizer, load_model, sequences, positions, targets,
+            mode=span_mode,
+            batch_size=scorer.batch_size,
+            max_tokens=scorer.max_tokens,
+            cache=scorer.cache,
+            fingerprint=scorer.fingerprint(model_name) if scorer.cache is not None else None,
+            classes=token_classes(tokenizer)
+        )
+        for entry in entries:
+            entry['top_k'] = [[token_id, log_prob, tokenizer.decode([token_id]).strip()]
+                              for token_id, log_prob in entry['top_k']]
+        return entries
+
+    def handle(self, payload: Dict) -> Dict:
+        """One JSON request: stimuli (or pre-encoded sequences + positions) plus targets"""
+        from mlm_scoring import _normalize_targets, tokenize_masked
+
+        model_name = payload['model']
+        if model_name not in self.model_names:
+            raise ValueError(f"Model '{model_name}' is not served, expected one of {self.model_names}")
+        if 'sequences' in payload:
+            sequences, positions = payload['sequences'], payload['positions']
+        else:
+            sequences, positions = tokenize_masked(self.scorer.tokenizer(model_name), payload['stimuli'])
+        targets = _normalize_targets(payload.get('targets'), len(sequences))
+
+        future = self.submit(model_name, sequences, positions, targets,
+                             operation=payload.get('operation', 'spans'),
+                             span_mode=payload.get('span_mode', 'pll'),
+                             normalize=payload.get('normalize', True))
+        return {'entries': future.result()}
+
+    def status(self) -> Dict:
+        return {
+            'models': self.model_names,
+            'variant': self.scorer.variant,
+            'batches': self.batches,
+            'requests': self.requests,
+            'cache': self.scorer.cache.stats() if self.scorer.cache is not None else None
+        }
+
+
+def _handler(server: ScoringServer):
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, code, body):
+            data = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._reply(200, server.status())
+            else:
+                self._reply(404, {'error': f"No route {self.path}"})
+
+        def do_POST(self):
+            if self.path != '/score':
+                self._reply(404, {'error': f"No route {self.path}"})
+                return
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                self._reply(200, server.handle(payload))
+            except (KeyError, ValueError) as e:
+                self._reply(400, {'error': str(e)})
+            except Exception as e:
+                self._reply(500, {'error': str(e)})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(url: str = SERVER_URL, model_names: Sequence[str] = None, variant: Optional[str] = None):
+    """Run the server in the foreground until interrupted"""
+    address = urlparse(url)
+    server = ScoringServer(model_names, variant=variant)
+    server.warm()
+    httpd = ThreadingHTTPServer((address.hostname, address.port), _handler(server))
+    print(f"Scoring server listening on {url}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+
+class ScoringClient:
+    """Talks to a running ScoringServer; entries come back in the engine's own format"""
+
+    def __init__(self, url: str = SERVER_URL, timeout: float = 300):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+
+    def available(self) -> bool:
+        try:
+            self.health()
+            return True
+        except (urllib.error.URLError, OSError):
+            return False
+
+    def health(self) -> Dict:
+        with urllib.request.urlopen(f"{self.url}/health", timeout=5) as response:
+            return json.loads(response.read())
+
+    def score(self, model_name: str, stimuli: Optional[Sequence[str]] = None,
+              targets: Optional[Sequence[Sequence[str]]] = None,
+              sequences: Optional[Sequence[Sequence[int]]] = None,
+              positions: Optional[Sequence[int]] = None,
+              operation: str = 'spans', span_mode: str = 'pll',
+              normalize: bool = True) -> List[Dict]:
+        """
+        score_spans (operation='spans') or score_candidates ('candidates') on the server
+        Pass either [MASK] stimuli or already encoded sequences and mask positions
+        """
+        payload = {'model': model_name, 'targets': targets, 'operation': operation,
+                   'span_mode': span_mode, 'normalize': normalize}
+        if sequences is not None:
+            payload['sequences'] = [list(map(int, ids)) for ids in sequences]
+            payload['positions'] = [int(p) for p in positions]
+        else:
+            payload['stimuli'] = list(stimuli)
+
+        request = urllib.request.Request(
+            f"{self.url}/score", data=json.dumps(payload).encode(),
+            headers={'Content-Type': 'application/json'}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())['entries']
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(f"Scoring server error: {json.loads(e.read()).get('error')}")
+
+    def fill_mask(self, model_name: str, stimuli: Sequence[str]) -> List[List[tuple]]:
+        """Top tokens (token, probability) at the mask of each stimulus"""
+        return [[(token, math.exp(log_prob)) for _, log_prob, token in entry['top_k']]
+                for entry in self.score(model_name, stimuli)]
+
+
+if __name__ == "__main__":
+    models = os.getenv('MLM_SERVER_MODELS')
+    serve(model_names=models.split(',') if models else None)
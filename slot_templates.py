@@ -0,0 +1,128 @@
+"""
+Slot-filling templates spliced at the token level
+Fixed text is tokenized once and every filler once, so a cartesian sweep
+over thousands of fillers never re-tokenizes a whole sentence
+"""
+
+import itertools
+import re
+import torch
+from typing import Dict, List, Optional, Sequence, Tuple
+from mlm_scoring import MASK_PLACEHOLDER, pad_sequences, tokenize_masked
+
+# [ADV], [WORD], [OBJ] ... ; [MASK] is the mask itself, not a slot
+SLOT_PATTERN = re.compile(r'\[([A-Z_]+)\]')
+
+
+class SlotTemplate:
+    """
+    A [MASK] sentence with named [SLOT]s, e.g. "The [OBJ] [ADV] fell [MASK]"
+    masked_slot turns one slot into the mask, so its filler is the word being
+    predicted rather than part of the input (e.g. "The [WORD] was there")
+
+    Pieces are joined with single spaces, as ' '.join(sentence.split()) would,
+    and an empty filler simply drops out. Each filler is checked once against
+    whole-sentence tokenization; combinations using a filler whose splice
+    doesn't match (e.g. a sentencepiece merge across the slot edge) are
+    tokenized in full instead
+    """
+
+    def __init__(self, tokenizer, template: str, masked_slot: Optional[str] = None):
+        self.tokenizer = tokenizer
+        self.template = template
+        self.masked_slot = masked_slot
+
+        # Units in order: ('text', str), ('slot', name) or ('mask', None)
+        self.units = []
+        for i, part in enumerate(SLOT_PATTERN.split(template)):
+            if i % 2 == 0:
+                if part.strip():
+                    self.units.append(('text', part.strip()))
+            elif part == MASK_PLACEHOLDER[1:-1] or part == masked_slot:
+                self.units.append(('mask', None))
+            else:
+                self.units.append(('slot', part))
+
+        if sum(kind == 'mask' for kind, _ in self.units) != 1:
+            raise ValueError(f"Template needs exactly one {MASK_PLACEHOLDER} or masked slot: {template}")
+        self.slots = [name for kind, name in self.units if kind == 'slot']
+        if len(set(self.slots)) != len(self.slots):
+            raise ValueError(f"Repeated slot in template: {template}")
+
+        # Special tokens wrapped around the body, and where the body starts
+        wrapped = tokenizer.build_inputs_with_special_tokens([tokenizer.mask_token_id])
+        self._offset = wrapped.index(tokenizer.mask_token_id)
+        self._pieces = {}
+        self._checked = {}
+
+    def _encode_piece(self, text: str, after_text: bool) -> List[int]:
+        """Ids of text as it appears mid-sentence (after_text) or sentence-initially"""
+        key = (text, after_text)
+        if key not in self._pieces:
+            self._pieces[key] = self.tokenizer.encode(
+                (' ' if after_text else '') + text, add_special_tokens=False
+            )
+        return self._pieces[key]
+
+    def text(self, fillers: Dict[str, str]) -> str:
+        """The sentence itself, with [MASK] at the masked position"""
+        words = []
+        for kind, value in self.units:
+            if kind == 'mask':
+                words.append(MASK_PLACEHOLDER)
+            else:
+                words.append(value if kind == 'text' else fillers[value].strip())
+        return ' '.join(w for w in words if w)
+
+    def splice(self, fillers: Dict[str, str]) -> Tuple[List[int], int]:
+        """Input ids (with special tokens) and mask position, joined from cached pieces"""
+        body = []
+        position = None
+        for kind, value in self.units:
+            if kind == 'mask':
+                position = len(body)
+                body.append(self.tokenizer.mask_token_id)
+                continue
+            text = value if kind == 'text' else fillers[value].strip()
+            if text:
+                body.extend(self._encode_piece(text, bool(body)))
+        return self.tokenizer.build_inputs_with_special_tokens(body), position + self._offset
+
+    def encode(self, fillers: Dict[str, str]) -> Tuple[List[int], int]:
+        """splice, unless a filler was found not to splice exactly for this tokenizer"""
+        if all(self._splices(slot, fillers) for slot in self.slots):
+            return self.splice(fillers)
+        sequences, positions = tokenize_masked(self.tokenizer, [self.text(fillers)])
+        return sequences[0], positions[0]
+
+    def _splices(self, slot: str, fillers: Dict[str, str]) -> bool:
+        key = (slot, fillers[slot])
+        if key not in self._checked:
+            sequences, positions = tokenize_masked(self.tokenizer, [self.text(fillers)])
+            self._checked[key] = (sequences[0], positions[0]) == self.splice(fillers)
+        return self._checked[key]
+
+    def combinations(self, fillers: Dict[str, Sequence[str]]) -> List[Dict[str, str]]:
+        """Every combination of fillers, the first slot varying slowest"""
+        names = list(fillers)
+        missing = set(self.slots) - set(names) - {self.masked_slot}
+        if missing:
+            raise ValueError(f"No fillers for slots {sorted(missing)}")
+        return [dict(zip(names, values)) for values in itertools.product(*(fillers[n] for n in names))]
+
+    def product(self, fillers: Dict[str, Sequence[str]]) -> Tuple[List[Dict[str, str]], List[List[int]], List[int]]:
+        """(combinations, input ids, mask positions) for the full cartesian product"""
+        combos = self.combinations(fillers)
+        encoded = [self.encode(combo) for combo in combos]
+        return combos, [ids for ids, _ in encoded], [position for _, position in encoded]
+
+    def tensors(self, fillers: Dict[str, Sequence[str]]) -> Dict:
+        """
+        The cartesian product as ready-to-batch tensors:
+        input_ids, attention_mask, mask_positions plus the combinations themselves
+        """
+        combos, sequences, positions = self.product(fillers)
+        inputs = pad_sequences(sequences, self.tokenizer.pad_token_id)
+        inputs['mask_positions'] = torch.tensor(positions, dtype=torch.long)
+        inputs['combinations'] = combos
+        return inputs
@@ -4,12 +4,11 @@ If LLMs are syntax machines, they should:
 2. Fail at semantic tasks requiring object understanding
 """
 
-from transformers import AutoModelForMaskedLM, AutoTokenizer
-import torch
+import math
+from mlm_scoring import MaskedLMScorer
 
-tokenizer = AutoTokenizer.from_pretrained('bert-base-uncased')
-model = AutoModelForMaskedLM.from_pretrained('bert-base-uncased')
-model.eval()
+scorer = MaskedLMScorer(['bert-base-uncased'])
+tokenizer = scorer.tokenizer('bert-base-uncased')
 
 print("=" * 70)
 print("TESTING: SYNTAX PRESERVATION VS SEMANTIC UNDERSTANDING")
@@ -21,21 +20,16 @@ tests = {
     "NONSENSE_PREDICATES": "The ball xyzqed [MASK] the hill",
 }
 
-for test_type, sentence in tests.items():
-    inputs = tokenizer(sentence, return_tensors='pt')
-    with torch.no_grad():
-        outputs = model(**inputs)
-    
-    mask_idx = (inputs['input_ids'] == tokenizer.mask_token_id).nonzero()[0,1]
-    probs = torch.softmax(outputs.logits[0, mask_idx], dim=-1)
-    
-    top5 = torch.topk(probs, 5)
-    predictions = [tokenizer.decode([idx]) for idx in top5.indices]
+entries = scorer.score_entries('bert-base-uncased', list(tests.values()), [[] for _ in tests])
+
+for (test_type, sentence), entry in zip(tests.items(), entries):
+    top5 = entry['top_k'][:5]
+    predictions = [tokenizer.decode([idx]) for idx, _ in top5]
     
     print(f"\n{test_type}:")
     print(f"  Sentence: {sentence}")
     print(f"  Predictions: {', '.join(predictions)}")
-    print(f"  Top confidence: {top5.values[0]:.3f}")
+    print(f"  Top confidence: {math.exp(top5[0][1]):.3f}")
 
 print("\n" + "=" * 70)
 print("HYPOTHESIS: Syntax preserved even with nonsense objects")
@@ -0,0 +1,93 @@
+"""
+Target words resolved to each model's in-context token ids
+A word at a mid-sentence [MASK] is a different piece in every vocabulary
+("today" for BERT, "Ġtoday" for RoBERTa, "▁today" for ALBERT), so targets are
+resolved once per tokenizer and looked up from a cache afterwards
+"""
+
+import pandas as pd
+import threading
+from typing import List, Sequence, Tuple
+import model_registry
+
+ALIGNMENT_COLUMNS = ['word', 'model', 'tokens', 'ids', 'pieces']
+
+
+class TargetResolver:
+    """Cached word -> in-context piece ids for one tokenizer"""
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self._pieces = {}
+        # Where the sentence body starts once special tokens are added
+        wrapped = tokenizer.build_inputs_with_special_tokens([tokenizer.mask_token_id])
+        self.body_offset = wrapped.index(tokenizer.mask_token_id)
+
+    def pieces(self, word: str, sentence_initial: bool = False) -> Tuple[int, ...]:
+        """
+        Piece ids of word as it appears after a space, or at the very start of
+        the sentence (no leading-space marker for byte-level BPE)
+        """
+        key = (word, sentence_initial)
+        if key not in self._pieces:
+            text = word.strip() if sentence_initial else ' ' + word.strip()
+            ids = tuple(self.tokenizer.encode(text, add_special_tokens=False))
+            if not ids:
+                raise ValueError(f"Target '{word}' has no tokens")
+            self._pieces[key] = ids
+        return self._pieces[key]
+
+    def first_id(self, word: str, sentence_initial: bool = False) -> int:
+        return self.pieces(word, sentence_initial)[0]
+
+    def at(self, word: str, position: int) -> Tuple[int, ...]:
+        """pieces for a word masked at position of an encoded input"""
+        return self.pieces(word, sentence_initial=position == self.body_offset)
+
+    def tokens(self, word: str, sentence_initial: bool = False) -> List[str]:
+        return self.tokenizer.convert_ids_to_tokens(list(self.pieces(word, sentence_initial)))
+
+
+_resolvers = {}
+_lock = threading.Lock()
+
+
+def resolver(tokenizer) -> TargetResolver:
+    """The process-wide resolver for a tokenizer"""
+    key = (type(tokenizer).__name__, tokenizer.name_or_path)
+    with _lock:
+        if key not in _resolvers:
+            _resolvers[key] = TargetResolver(tokenizer)
+        return _resolvers[key]
+
+
+def resolver_for(model_name: str) -> TargetResolver:
+    return resolver(model_registry.get_tokenizer(model_name))
+
+
+def alignment_table(words: Sequence[str], model_names: Sequence[str],
+                    sentence_initial: bool = False) -> pd.DataFrame:
+    """One row per (word, model): the pieces each vocabulary splits the word into"""
+    rows = []
+    for model_name in model_names:
+        target_resolver = resolver_for(model_name)
+        for word in words:
+            ids = target_resolver.pieces(word, sentence_initial)
+            rows.append({
+                'word': word,
+                'model': model_name,
+                'tokens': target_resolver.tokens(word, sentence_initial),
+                'ids': list(ids),
+                'pieces': len(ids)
+            })
+    return pd.DataFrame(rows, columns=ALIGNMENT_COLUMNS)
+
+
+def comparable_words(table: pd.DataFrame) -> List[str]:
+    """
+    Words that are a single piece in every model of an alignment table
+    Only for these is a vocabulary rank the same kind of quantity across models
+    """
+    single = table.groupby('word', sort=False)['pieces'].max() == 1
+    return single[single].index.tolist()
+
@@ -3,15 +3,14 @@ Statistical test: Do models that fail at temporal reasoning also fail at causal
 Based on Pearl (2009) - Causality: Models, Reasoning, and Inference
 """
 
-from transformers import AutoModelForMaskedLM, AutoTokenizer
-import torch
 import numpy as np
 from scipy import stats
 import json
+from mlm_scoring import MaskedLMScorer
+from target_vocab import resolver
 
-tokenizer = AutoTokenizer.from_pretrained('bert-base-uncased')
-model = AutoModelForMaskedLM.from_pretrained('bert-base-uncased')
-model.eval()
+scorer = MaskedLMScorer(['bert-base-uncased'])
+tokenizer = scorer.tokenizer('bert-base-uncased')
 
 print("=" * 70)
 print("QUANTITATIVE TEMPORAL-CAUSAL CORRELATION TEST")
@@ -50,30 +49,21 @@ def test_completion(sentence, mask_pos, expected):
     """Test model's ability to complete sentence correctly"""
     words = sentence.split()
     
-    inputs = tokenizer(sentence, return_tensors='pt')
-    with torch.no_grad():
-        outputs = model(**inputs)
-    
-    mask_idx = (inputs['input_ids'] == tokenizer.mask_token_id).nonzero()[0,1]
-    probs = torch.softmax(outputs.logits[0, mask_idx], dim=-1)
+    # In-context id of the expected word, so no "not in vocabulary" fallback
+    expected_id = resolver(tokenizer).first_id(expected)
+    entry = scorer.score_entries('bert-base-uncased', [sentence], [[expected_id]])[0]
     
     # Get top prediction
-    top_id = probs.argmax().item()
+    top_id, top_log_prob = entry['top_k'][0]
     top_word = tokenizer.decode([top_id])
-    confidence = probs[top_id].item()
+    confidence = float(np.exp(top_log_prob))
     
     # Check if it's punctuation
     is_punctuation = top_word in '.,;!?:'
     
     # Get rank of expected word
-    try:
-        expected_id = tokenizer.encode(expected, add_special_tokens=False)[0]
-        expected_prob = probs[expected_id].item()
-        all_probs_sorted = probs.argsort(descending=True)
-        expected_rank = (all_probs_sorted == expected_id).nonzero().item()
-    except:
-        expected_rank = 999  # Not in vocabulary
-        expected_prob = 0.0
+    expected_log_prob, expected_rank = entry['targets'][expected_id]
+    expected_prob = float(np.exp(expected_log_prob))
     
     return {
         'correct': top_word.lower() == expected.lower(),
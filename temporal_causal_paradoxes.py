@@ -6,12 +6,11 @@ IF P, THEN Q implies P happens BEFORE Q
 But what if Q causes P? What breaks?
 """
 
-from transformers import AutoModelForMaskedLM, AutoTokenizer
-import torch
+import math
+from mlm_scoring import MaskedLMScorer
 
-tokenizer = AutoTokenizer.from_pretrained('bert-base-uncased')
-model = AutoModelForMaskedLM.from_pretrained('bert-base-uncased')
-model.eval()
+scorer = MaskedLMScorer(['bert-base-uncased'])
+tokenizer = scorer.tokenizer('bert-base-uncased')
 
 print("=" * 70)
 print("TEMPORAL-CAUSAL PARADOX EXPERIMENTS")
@@ -50,18 +49,12 @@ for paradox_type, sentences in paradoxes.items():
     print(f"\n{paradox_type}:")
     print("-" * 40)
     
-    for sentence in sentences:
-        inputs = tokenizer(sentence, return_tensors='pt')
-        with torch.no_grad():
-            outputs = model(**inputs)
-        
-        mask_idx = (inputs['input_ids'] == tokenizer.mask_token_id).nonzero()[0,1]
-        probs = torch.softmax(outputs.logits[0, mask_idx], dim=-1)
-        
+    entries = scorer.score_entries('bert-base-uncased', sentences, [[] for _ in sentences])
+    for sentence, entry in zip(sentences, entries):
         # Get top 3 predictions
-        top3 = torch.topk(probs, 3)
-        predictions = [tokenizer.decode([idx]) for idx in top3.indices]
-        confidence = top3.values[0].item()
+        top3 = entry['top_k'][:3]
+        predictions = [tokenizer.decode([idx]) for idx, _ in top3]
+        confidence = math.exp(top3[0][1])
         
         print(f"'{sentence}'")
         print(f"  Predictions: {predictions}")
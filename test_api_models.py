@@ -69,6 +69,35 @@ def test_openai_gpt():
         print("✗ OpenAI library not installed. Run: pip install openai")
         return None
 
+def test_openai_logprobs():
+    """Score normal vs violation continuations by GPT token logprobs"""
+    try:
+        import openai
+    except ImportError:
+        print("✗ OpenAI library not installed. Run: pip install openai")
+        return None
+    
+    if not os.getenv('OPENAI_API_KEY'):
+        print("✗ No OPENAI_API_KEY found. Set with: export OPENAI_API_KEY='your-key'")
+        return None
+    
+    from api_logprobs import score_continuations
+    
+    print("\n🤖 Scoring continuations with OpenAI logprobs...")
+    print("-" * 40)
+    
+    results = score_continuations(PHYSICS_TESTS)
+    for test_name, result in results.items():
+        if 'error' in result:
+            print(f"Error with {test_name}: {result['error']}")
+            continue
+        symbol = "✓" if result['detects_violation'] else "✗"
+        print(f"{symbol} {test_name}: normal {result['normal_surprise']:.2f}, "
+              f"violation {result['violation_surprise']:.2f} "
+              f"(diff {result['difference']:+.2f}, per token {result['difference_per_token']:+.2f})")
+    
+    return results
+
 def test_anthropic_claude():
     """Test Claude using Anthropic API"""
     try:
@@ -147,6 +176,7 @@ if __name__ == "__main__":
     
     # Test each API
     gpt_results = test_openai_gpt()
+    logprob_results = test_openai_logprobs()
     claude_results = test_anthropic_claude()
     gemini_results = test_google_gemini()
     
@@ -156,6 +186,8 @@ if __name__ == "__main__":
     
     if gpt_results:
         print("✓ GPT tested successfully")
+    if logprob_results:
+        print("✓ GPT continuations scored")
     if claude_results:
         print("✓ Claude tested successfully")
     if gemini_results:
@@ -3,8 +3,7 @@ Test physics chaos across your LOCAL models
 You have: BERT, RoBERTa, ALBERT, DistilBERT
 """
 
-from transformers import AutoModelForMaskedLM, AutoTokenizer
-import torch
+from mlm_scoring import MaskedLMScorer
 import numpy as np
 
 MODELS_TO_TEST = [
@@ -37,64 +36,39 @@ physics_tests = {
     }
 }
 
+scorer = MaskedLMScorer(MODELS_TO_TEST)
+# Only the candidate words are scored, never the full vocabulary
+table = scorer.score_candidates(
+    [test['template'] for test in physics_tests.values()],
+    [[test['normal'], test['violation']] for test in physics_tests.values()]
+)
+test_names = list(physics_tests)
+
 all_results = {}
 
-for model_name in MODELS_TO_TEST:
+for model_name, model_table in table.groupby('model', sort=False):
     print(f"\n{'='*50}")
     print(f"MODEL: {model_name}")
     print('='*50)
     
-    tokenizer = AutoTokenizer.from_pretrained(model_name)
-    model = AutoModelForMaskedLM.from_pretrained(model_name)
-    model.eval()
-    
     model_results = {}
     
-    for test_name, test in physics_tests.items():
-        # Handle different mask tokens
-        if 'roberta' in model_name:
-            mask_token = '<mask>'
-        else:
-            mask_token = '[MASK]'
-        
-        sentence = test['template'].replace('[MASK]', mask_token)
-        
-        inputs = tokenizer(sentence, return_tensors='pt')
+    for stimulus_id, rows in model_table.groupby('stimulus_id'):
+        test_name = test_names[stimulus_id]
+        test = physics_tests[test_name]
+        normal, violation = rows.iloc[0], rows.iloc[1]
         
-        with torch.no_grad():
-            outputs = model(**inputs)
+        # Calculate surprise difference
+        normal_surprise = normal['target_surprise']
+        violation_surprise = violation['target_surprise']
+        difference = violation_surprise - normal_surprise
         
-        # Get mask position
-        if 'roberta' in model_name:
-            mask_id = tokenizer.mask_token_id
-        else:
-            mask_id = tokenizer.convert_tokens_to_ids([mask_token])[0]
-            
-        mask_idx = (inputs['input_ids'] == mask_id).nonzero()[0,1]
-        probs = torch.softmax(outputs.logits[0, mask_idx], dim=-1)
+        print(f"\n{test_name.upper()}:")
+        print(f"  '{test['normal']}': p={normal['target_prob']:.4f}, surprise={normal_surprise:.3f}")
+        print(f"  '{test['violation']}': p={violation['target_prob']:.4f}, surprise={violation_surprise:.3f}")
+        print(f"  Difference: {difference:.3f} ({'✓ detects' if difference > 0 else '✗ misses'} violation)")
         
-        # Get probabilities for normal vs violation
-        try:
-            normal_id = tokenizer.encode(test['normal'], add_special_tokens=False)[0]
-            violation_id = tokenizer.encode(test['violation'], add_special_tokens=False)[0]
-            
-            normal_prob = probs[normal_id].item()
-            violation_prob = probs[violation_id].item()
-            
-            # Calculate surprise difference
-            normal_surprise = -np.log(normal_prob + 1e-10)
-            violation_surprise = -np.log(violation_prob + 1e-10)
-            difference = violation_surprise - normal_surprise
-            
-            print(f"\n{test_name.upper()}:")
-            print(f"  '{test['normal']}': p={normal_prob:.4f}, surprise={normal_surprise:.3f}")
-            print(f"  '{test['violation']}': p={violation_prob:.4f}, surprise={violation_surprise:.3f}")
-            print(f"  Difference: {difference:.3f} ({'✓ detects' if difference > 0 else '✗ misses'} violation)")
-            
-            model_results[test_name] = difference
-            
-        except Exception as e:
-            print(f"  Error with {test_name}: {e}")
+        model_results[test_name] = difference
     
     all_results[model_name] = model_results
 
@@ -3,14 +3,10 @@ Testing if conversational models can handle retrocausality
 Using the scenarios we designed
 """
 
-import os
-from openai import OpenAI
-from anthropic import Anthropic
+from api_harness import chat, run_requests
 
-def test_retrocausality_openai(scenario):
-    """Test with GPT-3.5"""
-    client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-    
+def retrocausality_openai(scenario):
+    """GPT-3.5 request: the scenario presented as a conversation"""
     # Present scenario temporally
     messages = [
         {"role": "user", "content": scenario['setup']},
@@ -19,18 +15,10 @@ def test_retrocausality_openai(scenario):
         {"role": "user", "content": scenario['retroactive_query']}
     ]
     
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=messages,
-        temperature=0
-    )
-    
-    return response.choices[0].message.content
+    return chat('openai', messages, temperature=0)
 
-def test_retrocausality_claude(scenario):
-    """Test with Claude Haiku"""
-    client = Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
-    
+def retrocausality_claude(scenario):
+    """Claude Haiku request: the scenario in a single prompt"""
     prompt = f"""
     Setup: {scenario['setup']}
     Later: {scenario['future']}
@@ -39,14 +27,7 @@ def test_retrocausality_claude(scenario):
     Based on the future information, what can we conclude about the past?
     """
     
-    response = client.messages.create(
-        model="claude-3-haiku-20240307",
-        messages=[{"role": "user", "content": prompt}],
-        max_tokens=100,
-        temperature=0
-    )
-    
-    return response.content[0].text
+    return chat('anthropic', prompt, max_tokens=100, temperature=0)
 
 # Test scenarios
 scenarios = [
@@ -74,21 +55,23 @@ print("=" * 70)
 print("RETROCAUSALITY TEST: Can Models Update Past from Future?")
 print("=" * 70)
 
-for scenario in scenarios:
+# All scenarios for both models run concurrently, replies in scenario order
+replies = run_requests([build(scenario) for scenario in scenarios
+                        for build in (retrocausality_openai, retrocausality_claude)])
+
+for scenario, gpt_response, claude_response in zip(scenarios, replies[0::2], replies[1::2]):
     print(f"\n{scenario['name']}:")
     print("-" * 40)
     
-    try:
-        gpt_response = test_retrocausality_openai(scenario)
-        print(f"GPT-3.5: {gpt_response[:100]}...")
-    except:
+    if isinstance(gpt_response, Exception):
         print("GPT-3.5: [Need API key]")
+    else:
+        print(f"GPT-3.5: {gpt_response[:100]}...")
     
-    try:
-        claude_response = test_retrocausality_claude(scenario)
-        print(f"Claude: {claude_response[:100]}...")
-    except:
+    if isinstance(claude_response, Exception):
         print("Claude: [Need API key]")
+    else:
+        print(f"Claude: {claude_response[:100]}...")
 
 print("\n" + "=" * 70)
 print("If models update past states from future info,")
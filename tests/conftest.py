@@ -0,0 +1,48 @@
+"""
+Shared fixtures: a tiny randomly initialised BERT and WordPiece vocabulary,
+so tests never download a checkpoint
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+VOCAB_SIZE = 40
+PAD_ID = 0
+
+# "football" is two pieces (foot ##ball); every other word is one
+WORDS = ['the', 'ball', 'rock', 'fell', 'down', 'up', 'rolled', 'foot', '##ball', '.']
+VOCAB = ['[PAD]', '[UNK]', '[CLS]', '[SEP]', '[MASK]'] + WORDS
+VOCAB += [f'[unused{i}]' for i in range(VOCAB_SIZE - len(VOCAB))]
+
+
+@pytest.fixture
+def tiny_mlm():
+    """A one-layer BertForMaskedLM with a small vocabulary, in eval mode"""
+    torch = pytest.importorskip('torch')
+    transformers = pytest.importorskip('transformers')
+    torch.manual_seed(0)
+    config = transformers.BertConfig(
+        vocab_size=VOCAB_SIZE, hidden_size=16, num_hidden_layers=1, num_attention_heads=2,
+        intermediate_size=32, max_position_embeddings=32, pad_token_id=PAD_ID
+    )
+    return transformers.BertForMaskedLM(config).eval()
+
+
+@pytest.fixture
+def forward_calls(tiny_mlm):
+    """Encoder passes tiny_mlm has run, whether full forward or head-split"""
+    calls = []
+    tiny_mlm.base_model.register_forward_pre_hook(lambda module, args: calls.append(1))
+    return calls
+
+
+@pytest.fixture
+def tiny_tokenizer(tmp_path):
+    """A BertTokenizer over VOCAB, whose ids fit tiny_mlm"""
+    transformers = pytest.importorskip('transformers')
+    (tmp_path / 'vocab.txt').write_text('\n'.join(VOCAB) + '\n')
+    return transformers.BertTokenizer.from_pretrained(str(tmp_path))
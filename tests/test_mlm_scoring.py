@@ -0,0 +1,66 @@
+import pytest
+
+pytest.importorskip('torch')
+pytest.importorskip('transformers')
+
+from mlm_cache import MLMOutputCache
+from mlm_scoring import score_candidate_ids, score_spans
+
+PAD_ID = 0
+
+SEQUENCES = [[1, 5, 3, 2], [1, 6, 7, 8, 3, 2], [1, 9, 3, 2]]
+POSITIONS = [2, 3, 2]
+CANDIDATES = [[10, 11], [12], [10, 13]]
+
+
+def _not_loaded():
+    pytest.fail("The model was loaded although every item was cached")
+
+
+@pytest.mark.parametrize('normalize', [True, False])
+def test_warm_candidate_cache_makes_no_forward_calls(tiny_mlm, forward_calls, normalize):
+    cache = MLMOutputCache(':memory:')
+    cold = score_candidate_ids(lambda: tiny_mlm, SEQUENCES, POSITIONS, CANDIDATES, PAD_ID,
+                               normalize=normalize, cache=cache, fingerprint='tiny')
+    assert forward_calls
+
+    forward_calls.clear()
+    warm = score_candidate_ids(_not_loaded, SEQUENCES, POSITIONS, CANDIDATES, PAD_ID,
+                               normalize=normalize, cache=cache, fingerprint='tiny')
+    assert not forward_calls
+    assert warm == cold
+    assert cache.hits == len(SEQUENCES)
+
+
+def test_candidate_cache_keeps_log_probs_and_logits_apart(tiny_mlm):
+    cache = MLMOutputCache(':memory:')
+    log_probs = score_candidate_ids(lambda: tiny_mlm, SEQUENCES, POSITIONS, CANDIDATES, PAD_ID,
+                                    normalize=True, cache=cache, fingerprint='tiny')
+    logits = score_candidate_ids(lambda: tiny_mlm, SEQUENCES, POSITIONS, CANDIDATES, PAD_ID,
+                                 normalize=False, cache=cache, fingerprint='tiny')
+    assert log_probs != logits
+    assert all(score < 0 for scores in log_probs for score in scores.values())
+
+
+def test_new_candidates_for_a_cached_input_are_scored_and_merged(tiny_mlm, forward_calls):
+    cache = MLMOutputCache(':memory:')
+    score_candidate_ids(lambda: tiny_mlm, SEQUENCES[:1], POSITIONS[:1], [[10]], PAD_ID,
+                        cache=cache, fingerprint='tiny')
+    both = score_candidate_ids(lambda: tiny_mlm, SEQUENCES[:1], POSITIONS[:1], [[10, 11]], PAD_ID,
+                               cache=cache, fingerprint='tiny')
+
+    forward_calls.clear()
+    again = score_candidate_ids(_not_loaded, SEQUENCES[:1], POSITIONS[:1], [[11, 10]], PAD_ID,
+                                cache=cache, fingerprint='tiny')
+    assert not forward_calls
+    assert again == both
+
+
+@pytest.mark.parametrize('mode', ['pll', 'chain', 'joint'])
+def test_multi_piece_targets_have_no_rank(tiny_mlm, tiny_tokenizer, mode):
+    (entry,) = score_spans(tiny_tokenizer, lambda: tiny_mlm, ["the ball fell [MASK] ."],
+                           [["down", "football"]], mode=mode)
+    assert entry['targets']['football']['pieces'] == 2
+    assert entry['targets']['football']['rank'] is None
+    assert entry['targets']['down']['pieces'] == 1
+    assert isinstance(entry['targets']['down']['rank'], int)
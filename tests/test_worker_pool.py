@@ -0,0 +1,42 @@
+import multiprocessing
+
+import pytest
+
+pytest.importorskip('torch')
+pytest.importorskip('transformers')
+if 'fork' not in multiprocessing.get_all_start_methods():
+    pytest.skip("Shared-weight workers need the 'fork' start method", allow_module_level=True)
+
+import model_registry
+import worker_pool
+from mlm_scoring import forward_entries
+
+PAD_ID = 0
+
+# Deliberately not sorted by length, with different targets per item
+SEQUENCES = [[1, 5, 6, 7, 3, 2], [1, 3, 2], [1, 8, 9, 3, 2]]
+POSITIONS = [4, 1, 3]
+TARGETS = [[10, 11], [12], [13, 14]]
+
+
+@pytest.fixture
+def pool(tiny_mlm, monkeypatch):
+    # Patched before the fork, so the workers inherit the tiny model too
+    monkeypatch.setattr(model_registry, 'get_model', lambda model_name, variant=None: (None, tiny_mlm))
+    monkeypatch.setattr(worker_pool, 'token_classes', lambda tokenizer: None)
+    with worker_pool.ForkedScoringPool(['tiny'], workers=2, variant='fp32') as pool:
+        yield pool
+
+
+def test_unsorted_batch_keeps_input_order(pool, tiny_mlm):
+    task = ('tiny', 'fp32', [7, 8, 9], SEQUENCES, POSITIONS, TARGETS, PAD_ID, False)
+    batch, entries = pool._pool.apply(worker_pool._run_batch, (task,))
+    assert batch == [7, 8, 9]
+
+    for ids, position, targets, entry in zip(SEQUENCES, POSITIONS, TARGETS, entries):
+        ((_, (expected,)),) = forward_entries(lambda: tiny_mlm, [ids], [position], [targets], PAD_ID)
+        assert sorted(entry['targets']) == sorted(targets)
+        for target in targets:
+            log_prob, rank = entry['targets'][target]
+            assert log_prob == pytest.approx(expected['targets'][target][0], abs=1e-5)
+            assert rank == expected['targets'][target][1]
@@ -0,0 +1,108 @@
+"""
+Per-model token-class masks over the whole vocabulary
+Punctuation, stopwords, subword continuations, numbers and special tokens are
+marked once per tokenizer, so "did the model default to punctuation?" is a
+lookup and the probability mass on each class is one matmul per batch
+"""
+
+import threading
+import unicodedata
+import torch
+from typing import List
+
+# Checked in this order when a token belongs to several classes
+TOKEN_CLASSES = ('special', 'punctuation', 'number', 'continuation', 'stopword')
+
+# Tokens in none of the classes
+CONTENT_CLASS = 'content'
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before
+being below between both but by can could did do does doing down during each few for
+from further had has have having he her here hers herself him himself his how i if in
+into is it its itself just me more most my myself no nor not now of off on once only or
+other our ours ourselves out over own same she should so some such than that the their
+theirs them themselves then there these they this those through to too under until up
+very was we were what when where which while who whom why will with would you your yours
+yourself yourselves
+""".split())
+
+
+class TokenClassMasks:
+    """Boolean vocabulary masks of one tokenizer, one column per TOKEN_CLASSES entry"""
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.word_start = _word_start_marker(tokenizer)
+
+        vocab_size = len(tokenizer)
+        tokens = tokenizer.convert_ids_to_tokens(list(range(vocab_size)))
+        special = set(tokenizer.all_special_ids)
+
+        self.masks = torch.tensor(
+            [self._classify(token_id, token or '', special) for token_id, token in enumerate(tokens)],
+            dtype=torch.bool
+        )
+        # Float copy for probability-mass matmuls
+        self.matrix = self.masks.float()
+
+    def _classify(self, token_id: int, token: str, special: set) -> List[bool]:
+        if token_id in special:
+            return [name == 'special' for name in TOKEN_CLASSES]
+
+        if self.word_start == '##':
+            continuation = token.startswith('##')
+            surface = token[2:] if continuation else token
+        else:
+            continuation = not token.startswith(self.word_start)
+            surface = token[len(self.word_start):] if not continuation else token
+
+        return [
+            False,
+            bool(surface) and all(unicodedata.category(c).startswith('P') for c in surface),
+            bool(surface) and surface.replace(',', '').replace('.', '').isdigit(),
+            continuation and bool(surface),
+            not continuation and surface.lower() in STOPWORDS
+        ]
+
+    def is_class(self, token_id: int, name: str) -> bool:
+        return bool(self.masks[token_id, TOKEN_CLASSES.index(name)])
+
+    def token_class(self, token_id: int) -> str:
+        """The first of TOKEN_CLASSES the token belongs to, else CONTENT_CLASS"""
+        row = self.masks[token_id]
+        for name, is_member in zip(TOKEN_CLASSES, row.tolist()):
+            if is_member:
+                return name
+        return CONTENT_CLASS
+
+    def class_mass(self, logits: torch.Tensor) -> torch.Tensor:
+        """(batch, vocab) logits -> (batch, classes) total probability on each class"""
+        matrix = self.matrix[:logits.shape[-1]]
+        if len(matrix) < logits.shape[-1]:
+            # Output rows beyond the tokenizer's vocabulary belong to no class
+            padding = torch.zeros((logits.shape[-1] - len(matrix), len(TOKEN_CLASSES)))
+            matrix = torch.cat([matrix, padding])
+        return torch.softmax(logits, dim=-1) @ matrix.to(logits.device)
+
+
+def _word_start_marker(tokenizer) -> str:
+    """'Ġ' (byte-level BPE), '▁' (sentencepiece), or '##' when continuations are marked instead"""
+    token = tokenizer.convert_ids_to_tokens(tokenizer.encode(' the', add_special_tokens=False))[0]
+    for marker in ('Ġ', '▁'):
+        if token.startswith(marker):
+            return marker
+    return '##'
+
+
+_masks = {}
+_lock = threading.Lock()
+
+
+def token_classes(tokenizer) -> TokenClassMasks:
+    """The process-wide class masks of a tokenizer, built on first request"""
+    key = (type(tokenizer).__name__, tokenizer.name_or_path)
+    with _lock:
+        if key not in _masks:
+            _masks[key] = TokenClassMasks(tokenizer)
+        return _masks[key]
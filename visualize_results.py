@@ -12,12 +12,10 @@ def create_violation_plot():
     normal_scores = []
     violation_scores = []
     
-    for test_name, test_data in PHYSICS_TESTS.items():
-        result = detector.test_violation_pair(
-            test_data['normal'],
-            test_data['violation'],
-            test_data['target']
-        )
+    pairs = [(t['normal'], t['violation'], t['target']) for t in PHYSICS_TESTS.values()]
+    pair_results = detector.test_violation_pairs(pairs)
+    
+    for test_name, result in zip(PHYSICS_TESTS, pair_results):
         tests.append(test_name.replace('_', ' ').title())
         normal_scores.append(result['normal_surprise'])
         violation_scores.append(result['violation_surprise'])
@@ -0,0 +1,99 @@
+"""
+Forked worker pool sharing one copy of the model weights
+Checkpoints are loaded once in the parent, then workers are forked, so every
+worker reads the same (copy-on-write) weight pages instead of loading its
+own copy; each worker gets an equal share of the cores for torch threads
+"""
+
+import multiprocessing
+import os
+import torch
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from mlm_scoring import MAX_BATCH_TOKENS, forward_entries, length_batches
+from token_classes import token_classes
+import mlm_cache
+import model_registry
+
+
+# A parent's SQLite connection, parked so the child never uses or closes it
+_inherited_cache = None
+
+
+def _init_worker(threads: int):
+    global _inherited_cache
+    torch.set_num_threads(threads)
+    # SQLite connections must not cross a fork: should anything in the child
+    # ask for the cache, default_cache() opens a fresh connection of its own
+    _inherited_cache = mlm_cache._default_cache
+    mlm_cache._default_cache = None
+
+
+def _run_batch(task) -> Tuple[List[int], List[Dict]]:
+    """Score one batch in a worker with the weights inherited from the parent"""
+    model_name, variant, batch, sequences, positions, target_ids, pad_id, with_classes = task
+    tokenizer, model = model_registry.get_model(model_name, variant)
+    classes = token_classes(tokenizer) if with_classes else None
+    # forward_entries yields in its own length-sorted order; put entries back in batch order
+    entries = [None] * len(sequences)
+    for indices, scored in forward_entries(lambda: model, sequences, positions, target_ids, pad_id,
+                                           batch_size=len(sequences), max_tokens=None, classes=classes):
+        for index, entry in zip(indices, scored):
+            entries[index] = entry
+    return batch, entries
+
+
+class ForkedScoringPool:
+    """
+    Workers forked after model_names are loaded, for MaskedLMScorer(workers=N)
+    Create it before the parent runs any forward pass: forking a process whose
+    torch thread pool is already running can hang the children
+    """
+
+    def __init__(self, model_names: Sequence[str], workers: Optional[int] = None,
+                 variant: Optional[str] = None):
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            raise RuntimeError("Shared-weight workers need the 'fork' start method (Linux/macOS)")
+        self.variant = variant or model_registry.DEFAULT_VARIANT
+        if self.variant == 'onnx':
+            raise ValueError("ONNX Runtime sessions can't be shared across forked workers")
+
+        cores = os.cpu_count() or 1
+        self.workers = workers or cores
+        self.threads = max(1, cores // self.workers)
+
+        # Everything the workers need lives in the parent's registry before the fork
+        self.model_names = list(model_names)
+        for model_name in self.model_names:
+            tokenizer, model = model_registry.get_model(model_name, self.variant)
+            token_classes(tokenizer)
+
+        self._pool = multiprocessing.get_context('fork').Pool(
+            self.workers, initializer=_init_worker, initargs=(self.threads,)
+        )
+
+    def forward(self, model_name: str):
+        """A forward_entries stand-in that spreads the batches over the workers"""
+        if model_name not in self.model_names:
+            raise ValueError(f"Model '{model_name}' was not loaded before the workers were forked")
+
+        def run(sequences, positions, target_ids, pad_id, batch_size: int = 32,
+                max_tokens: Optional[int] = MAX_BATCH_TOKENS, classes=None) -> Iterator:
+            tasks = [
+                (model_name, self.variant, batch,
+                 [sequences[i] for i in batch], [positions[i] for i in batch],
+                 [target_ids[i] for i in batch], pad_id, classes is not None)
+                for batch in length_batches([len(ids) for ids in sequences], batch_size, max_tokens)
+            ]
+            return self._pool.imap_unordered(_run_batch, tasks)
+
+        return run
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()